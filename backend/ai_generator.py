@@ -1,5 +1,5 @@
 import anthropic  # type: ignore
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 
 
 class AIGenerator:
@@ -61,7 +61,94 @@ Provide only the direct answer to what was asked.
         Returns:
             Generated response as string
         """
+        api_params = self._build_params(query, conversation_history, tools)
 
+        # Get response from Claude
+        response = self.client.messages.create(**api_params)
+
+        # Handle tool execution if needed
+        if response.stop_reason == "tool_use" and tool_manager:
+            return self._handle_tool_execution(response, api_params, tool_manager)
+
+        # Return direct response
+        return response.content[0].text
+
+    def generate_response_stream(
+        self,
+        query: str,
+        conversation_history: Optional[str] = None,
+        tools: Optional[List] = None,
+        tool_manager=None,
+    ) -> Iterator[str]:
+        """
+        Stream an AI response as text deltas, running tool rounds in between.
+
+        Follows the same tool-calling flow as generate_response, but every API
+        call is streamed, so the final answer arrives as it is generated.
+
+        Args:
+            query: The user's question or request
+            conversation_history: Previous messages for context
+            tools: Available tools the AI can use
+            tool_manager: Manager to execute tools
+
+        Yields:
+            Text deltas of the response
+        """
+        api_params = self._build_params(query, conversation_history, tools)
+
+        # Hold back text only when a tool round might follow it
+        hold_preambles = tool_manager is not None
+        response = yield from self._stream_message(api_params, hold_preambles)
+        if response.stop_reason != "tool_use" or not tool_manager:
+            return
+
+        rounds = _ToolRounds(self, api_params, tool_manager)
+        params = rounds.next_params(response)
+        while params is not None:
+            response = yield from self._stream_message(params, hold_preambles)
+            params = rounds.next_params(response)
+
+    def _stream_message(self, params: Dict[str, Any], hold_preambles: bool):
+        """
+        Yield text deltas of one streamed API call, returning the full message.
+
+        When tools are offered and hold_preambles is set, text is held back
+        until it reaches a paragraph break or the call ends, and dropped if a
+        tool_use block starts first, so a preamble like "Let me search..."
+        never reaches the client. RAGSystem.query_stream only emits whole
+        paragraphs, so holding text until the first break costs it nothing.
+        """
+        holding = hold_preambles and "tools" in params
+        held: List[str] = []
+        with self.client.messages.stream(**params) as stream:
+            for event in stream:
+                if event.type == "text":
+                    if not holding:
+                        yield event.text
+                        continue
+                    held.append(event.text)
+                    # A break may be split across two deltas
+                    if "\n\n" in "".join(held[-2:]):
+                        holding = False
+                        yield from held
+                        held = []
+                elif (
+                    event.type == "content_block_start"
+                    and event.content_block.type == "tool_use"
+                ):
+                    held = []
+            message = stream.get_final_message()
+        yield from held
+        return message
+
+    def _build_params(
+        self,
+        query: str,
+        conversation_history: Optional[str],
+        tools: Optional[List],
+    ) -> Dict[str, Any]:
+        """Build the parameters for the first API call of a response"""
         # Build system content efficiently - avoid string ops when possible
         system_content = (
             f"{self.SYSTEM_PROMPT}\n\nPrevious conversation:\n{conversation_history}"
@@ -81,15 +168,30 @@ Provide only the direct answer to what was asked.
             api_params["tools"] = tools
             api_params["tool_choice"] = {"type": "auto"}
 
-        # Get response from Claude
-        response = self.client.messages.create(**api_params)
-
-        # Handle tool execution if needed
-        if response.stop_reason == "tool_use" and tool_manager:
-            return self._handle_tool_execution(response, api_params, tool_manager)
+        return api_params
 
-        # Return direct response
-        return response.content[0].text
+    def _execute_tools(self, response, tool_manager) -> Tuple[List[Dict], bool]:
+        """Run every tool call in a response, returning results and an error flag"""
+        tool_results = []
+        has_error = False
+        for content_block in response.content:
+            if content_block.type == "tool_use":
+                tool_result = tool_manager.execute_tool(
+                    content_block.name, **content_block.input
+                )
+
+                # Check for tool execution error
+                if isinstance(tool_result, str) and tool_result.startswith("Error:"):
+                    has_error = True
+
+                tool_results.append(
+                    {
+                        "type": "tool_result",
+                        "tool_use_id": content_block.id,
+                        "content": tool_result,
+                    }
+                )
+        return tool_results, has_error
 
     def _handle_tool_execution(
         self, initial_response, base_params: Dict[str, Any], tool_manager
@@ -105,69 +207,76 @@ Provide only the direct answer to what was asked.
         Returns:
             Final response text after tool execution
         """
+        rounds = _ToolRounds(self, base_params, tool_manager)
+        response = initial_response
+        params = rounds.next_params(response)
+        while params is not None:
+            response = self.client.messages.create(**params)
+            params = rounds.next_params(response)
+        return response.content[0].text
+
+
+class _ToolRounds:
+    """
+    Conversation state for the tool rounds of one response.
+
+    Shared by the streaming and non-streaming paths: each caller makes the
+    API calls itself and passes every response to next_params.
+    """
+
+    def __init__(
+        self, generator: AIGenerator, base_params: Dict[str, Any], tool_manager
+    ):
+        self.generator = generator
+        self.base_params = base_params
+        self.tool_manager = tool_manager
         # Start with existing messages
-        messages = base_params["messages"].copy()
-        tools = base_params.get("tools")
-        current_response = initial_response
-        rounds = 0
-        has_error = False
+        self.messages = base_params["messages"].copy()
+        self.tools = base_params.get("tools")
+        self.rounds = 0
+        self.has_error = False
+        self.forced_final = False
+
+    def next_params(self, response) -> Optional[Dict[str, Any]]:
+        """
+        Run the response's tool calls and build the params for the next call.
 
-        while current_response.stop_reason == "tool_use" and rounds < self.MAX_TOOL_ROUNDS:
-            rounds += 1
-
-            # Add AI's tool use response
-            messages.append({"role": "assistant", "content": current_response.content})
-
-            # Execute all tool calls and collect results
-            tool_results = []
-            for content_block in current_response.content:
-                if content_block.type == "tool_use":
-                    tool_result = tool_manager.execute_tool(
-                        content_block.name, **content_block.input
-                    )
-
-                    # Check for tool execution error
-                    if isinstance(tool_result, str) and tool_result.startswith("Error:"):
-                        has_error = True
-
-                    tool_results.append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": content_block.id,
-                            "content": tool_result,
-                        }
-                    )
-
-            # Add tool results as single message
-            if tool_results:
-                messages.append({"role": "user", "content": tool_results})
-
-            # Prepare next API call - include tools within allowed rounds
-            next_params = {
-                **self.base_params,
-                "messages": messages,
-                "system": base_params["system"],
-            }
-
-            # Include tools for potential sequential calls (unless error)
-            if tools and not has_error:
-                next_params["tools"] = tools
-                next_params["tool_choice"] = {"type": "auto"}
-
-            # Get next response
-            current_response = self.client.messages.create(**next_params)
-
-            # Exit loop on error
-            if has_error:
-                break
+        Returns:
+            Params for the next API call, or None once response is the final one
+        """
+        # Stop on a text answer, after a tool error, or after the forced answer
+        if response.stop_reason != "tool_use" or self.has_error or self.forced_final:
+            return None
+
+        params = {
+            **self.generator.base_params,
+            "messages": self.messages,
+            "system": self.base_params["system"],
+        }
 
         # If Claude still wants tools but we've hit max rounds, force text response
-        if current_response.stop_reason == "tool_use" and not has_error:
-            final_params = {
-                **self.base_params,
-                "messages": messages,
-                "system": base_params["system"],
-            }
-            current_response = self.client.messages.create(**final_params)
-
-        return current_response.content[0].text
+        if self.rounds >= self.generator.MAX_TOOL_ROUNDS:
+            self.forced_final = True
+            return params
+
+        self.rounds += 1
+
+        # Add AI's tool use response
+        self.messages.append({"role": "assistant", "content": response.content})
+
+        # Execute all tool calls and collect results
+        tool_results, tool_error = self.generator._execute_tools(
+            response, self.tool_manager
+        )
+        self.has_error = self.has_error or tool_error
+
+        # Add tool results as single message
+        if tool_results:
+            self.messages.append({"role": "user", "content": tool_results})
+
+        # Include tools for potential sequential calls (unless error)
+        if self.tools and not self.has_error:
+            params["tools"] = self.tools
+            params["tool_choice"] = {"type": "auto"}
+
+        return params
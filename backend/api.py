@@ -0,0 +1,102 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+import orjson
+
+
+# Pydantic models for request/response; response models only document the schema
+class QueryRequest(BaseModel):
+    """Request model for course queries"""
+
+    query: str
+    session_id: Optional[str] = None
+
+
+class QueryResponse(BaseModel):
+    """Response model for course queries"""
+
+    answer: str
+    sources: List[dict]  # "text" and "score", plus "link" when the lesson has one
+    session_id: str
+
+
+class CourseStats(BaseModel):
+    """Response model for course statistics"""
+
+    total_courses: int
+    course_titles: List[str]
+
+
+def drop_none_fields(sources: List[dict]) -> List[dict]:
+    """Omit None-valued source fields, such as missing links, from the payload"""
+    return [{k: v for k, v in s.items() if v is not None} for s in sources]
+
+
+def create_router(rag_system) -> APIRouter:
+    """Build the /api endpoints around the given RAG system"""
+    router = APIRouter()
+
+    @router.post("/api/query", responses={200: {"model": QueryResponse}})
+    async def query_documents(request: QueryRequest):
+        """Process a query and return response with sources"""
+        try:
+            # Create session if not provided
+            session_id = request.session_id
+            if not session_id:
+                session_id = rag_system.session_manager.create_session()
+
+            # Process query using RAG system
+            answer, sources = rag_system.query(request.query, session_id)
+
+            return ORJSONResponse(
+                {
+                    "answer": answer,
+                    "sources": drop_none_fields(sources),
+                    "session_id": session_id,
+                }
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @router.post("/api/query/stream")
+    async def query_documents_stream(request: QueryRequest):
+        """Process a query, streaming the response as server-sent events"""
+        # Create session if not provided
+        session_id = request.session_id
+        if not session_id:
+            session_id = rag_system.session_manager.create_session()
+
+        def events():
+            try:
+                for text, sources in rag_system.query_stream(request.query, session_id):
+                    if sources is None:
+                        event = {"type": "text", "text": text}
+                    else:
+                        event = {
+                            "type": "done",
+                            "sources": drop_none_fields(sources),
+                            "session_id": session_id,
+                        }
+                    yield b"data: " + orjson.dumps(event) + b"\n\n"
+            except Exception as e:
+                error = {"type": "error", "detail": str(e)}
+                yield b"data: " + orjson.dumps(error) + b"\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @router.get("/api/courses", responses={200: {"model": CourseStats}})
+    async def get_course_stats():
+        """Get course analytics and statistics"""
+        try:
+            analytics = rag_system.get_course_analytics()
+            return ORJSONResponse(
+                {
+                    "total_courses": analytics["total_courses"],
+                    "course_titles": analytics["course_titles"],
+                }
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return router
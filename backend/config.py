@@ -23,8 +23,16 @@ class Config:
     MAX_RESULTS: int = 5  # Maximum search results to return
     MAX_HISTORY: int = 2  # Number of conversation messages to remember
 
+    # Semantic query cache settings (opt-in)
+    SEMANTIC_CACHE_ENABLED: bool = False  # Serve near-duplicate questions from cache
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_TTL: int = 300  # Seconds a cached response stays valid
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 128  # Cached responses per session
+
     # Database paths
     CHROMA_PATH: str = "./chroma_db"  # ChromaDB storage location
+    # Embedding cache is opt-in; set e.g. "./embedding_cache.db" to enable
+    EMBEDDING_CACHE_PATH: str = ""
 
 
 config = Config()
@@ -1,9 +1,19 @@
 import os
 import re
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
 from models import Course, Lesson, CourseChunk
 
 
+class ProcessingResult(NamedTuple):
+    """Outcome of processing one course document, without raising"""
+
+    ok: bool
+    course: Optional[Course]
+    chunks: List[CourseChunk]
+    error: Optional[str]
+    file: str
+
+
 class DocumentProcessor:
     """Processes course documents and extracts structured information"""
 
@@ -93,6 +103,38 @@ class DocumentProcessor:
 
         return chunks
 
+    def peek_course_title(self, file_path: str) -> Optional[str]:
+        """
+        Read only the head of a course document and return its title.
+
+        Returns None when the first line isn't complete within the head, so
+        the caller falls back to full processing.
+        """
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as file:
+            head = file.read(4096)
+
+        first_line, newline, _ = head.lstrip().partition("\n")
+        if not newline and len(head) == 4096:
+            return None
+        if not first_line.strip():
+            return os.path.basename(file_path)  # Same fallback as a full parse
+        return self._parse_course_title(first_line)
+
+    def _parse_course_title(self, line: str) -> str:
+        """Parse the course title from the first line of a document"""
+        title_match = re.match(r"^Course Title:\s*(.+)$", line.strip(), re.IGNORECASE)
+        if title_match:
+            return title_match.group(1).strip()
+        return line.strip()
+
+    def safe_process(self, file_path: str) -> ProcessingResult:
+        """Process a course document, capturing any failure in the result"""
+        try:
+            course, chunks = self.process_course_document(file_path)
+            return ProcessingResult(True, course, chunks, None, file_path)
+        except Exception as e:
+            return ProcessingResult(False, None, [], str(e), file_path)
+
     def process_course_document(
         self, file_path: str
     ) -> Tuple[Course, List[CourseChunk]]:
@@ -115,13 +157,7 @@ class DocumentProcessor:
 
         # Parse course title from first line
         if len(lines) >= 1 and lines[0].strip():
-            title_match = re.match(
-                r"^Course Title:\s*(.+)$", lines[0].strip(), re.IGNORECASE
-            )
-            if title_match:
-                course_title = title_match.group(1).strip()
-            else:
-                course_title = lines[0].strip()
+            course_title = self._parse_course_title(lines[0])
 
         # Parse remaining lines for course metadata
         for i in range(1, min(len(lines), 4)):  # Check first 4 lines for metadata
@@ -0,0 +1,90 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+
+# SQLite caps the number of bound parameters in a single statement
+MAX_QUERY_PARAMS = 500
+
+
+def quantize(vec) -> Tuple[float, bytes]:
+    """Symmetric int8 quantization; cosine top-k barely moves at 8 bits"""
+    vec = np.asarray(vec, dtype=np.float32)
+    scale = float(np.max(np.abs(vec))) or 1.0
+    q8 = np.round(vec / scale * 127).astype(np.int8)
+    return scale, q8.tobytes()
+
+
+def dequantize(scale: float, data: bytes) -> np.ndarray:
+    """Inverse of quantize, back to float32"""
+    return np.frombuffer(data, dtype=np.int8).astype(np.float32) * (scale / 127)
+
+
+class EmbeddingCache:
+    """Persistent text -> embedding store that survives restarts"""
+
+    def __init__(self, path: str, model: str):
+        self.model = model  # Part of every key, so switching models never mixes
+        # Sync endpoints run in a thread pool, so share one guarded connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            # Vectors are int8 with a per-vector scale
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emb_q8 (key BLOB PRIMARY KEY,"
+                " model TEXT, scale REAL, vec BLOB, ts INTEGER)"
+            )
+
+    def _key(self, text: str) -> bytes:
+        """SHA-256 of the model name and text"""
+        return hashlib.sha256(f"{self.model}|{text}".encode()).digest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the cached embedding for each text, or None where missing"""
+        keys = [self._key(text) for text in texts]
+        found = {}
+        for start in range(0, len(keys), MAX_QUERY_PARAMS):
+            batch = keys[start : start + MAX_QUERY_PARAMS]
+            placeholders = ",".join("?" * len(batch))
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, scale, vec FROM emb_q8"
+                    f" WHERE key IN ({placeholders})",
+                    batch,
+                ).fetchall()
+            for key, scale, vec in rows:
+                found[key] = dequantize(scale, vec)
+        return [found.get(key) for key in keys]
+
+    def put_many(self, texts: List[str], vectors: List):
+        """Store embeddings for texts, replacing any existing entries"""
+        now = int(time.time())
+        rows = [
+            (self._key(text), self.model, *quantize(vec), now)
+            for text, vec in zip(texts, vectors)
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emb_q8 VALUES (?, ?, ?, ?, ?)", rows
+            )
+
+    def embed(
+        self, texts: List[str], encode: Callable[[List[str]], List]
+    ) -> List[np.ndarray]:
+        """Embed texts, calling encode only for the ones not cached yet"""
+        vectors = self.get_many(texts)
+        misses = [i for i, vec in enumerate(vectors) if vec is None]
+        if misses:
+            missing_texts = [texts[i] for i in misses]
+            computed = encode(missing_texts)
+            self.put_many(missing_texts, computed)
+            for i, vec in zip(misses, computed):
+                vectors[i] = np.asarray(vec, dtype=np.float32)
+        return vectors
+
+    def close(self):
+        """Close the underlying database connection"""
+        with self._lock:
+            self._conn.close()
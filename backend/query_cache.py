@@ -0,0 +1,153 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+# Rows scored per step, keeping the float32 intermediate small enough for cache
+SCAN_BLOCK_ROWS = 1024
+
+# Rows allocated for a new session; the matrix doubles up to capacity as it fills
+INITIAL_ROWS = 8
+
+
+class _Namespace:
+    """Cached query embeddings and responses for a single session"""
+
+    def __init__(self, dim: int, capacity: int):
+        # L2-normalized embeddings in rows [0, n); float16 halves the bytes
+        # scanned per lookup, and doubling keeps inserts amortized copy-free
+        self.capacity = capacity
+        self.M = np.empty((min(capacity, INITIAL_ROWS), dim), dtype=np.float16)
+        self.n = 0
+        self.entries: List[Tuple[str, List]] = []  # (response, sources) per row
+        self.created: List[float] = []  # Insert time per row, for TTL expiry
+        self.last_used: List[float] = []  # Last hit time per row, for LRU eviction
+
+    def append(self, q: np.ndarray, entry: Tuple[str, List], now: float):
+        """Store an entry in the next free row"""
+        if self.n == len(self.M):
+            grown = np.empty(
+                (min(2 * self.n, self.capacity), self.M.shape[1]), self.M.dtype
+            )
+            grown[: self.n] = self.M
+            self.M = grown
+        self.M[self.n] = q
+        self.n += 1
+        self.entries.append(entry)
+        self.created.append(now)
+        self.last_used.append(now)
+
+    def remove(self, rows: List[int]):
+        """Drop the given rows, moving the last row into each gap"""
+        # Highest rows first, so the row moved into a gap is never one to drop
+        for row in sorted(rows, reverse=True):
+            last = self.n - 1
+            if row != last:
+                self.M[row] = self.M[last]
+                self.entries[row] = self.entries[last]
+                self.created[row] = self.created[last]
+                self.last_used[row] = self.last_used[last]
+            self.entries.pop()
+            self.created.pop()
+            self.last_used.pop()
+            self.n = last
+
+
+class SemanticQueryCache:
+    """Serves repeated or near-duplicate questions without calling the AI"""
+
+    def __init__(
+        self,
+        embed: Callable[[List[str]], List],
+        threshold: float = 0.95,
+        ttl: float = 300,
+        max_entries: int = 128,
+    ):
+        self.embed = embed
+        self.threshold = threshold  # Minimum cosine similarity for a hit
+        self.ttl = ttl  # Seconds a cached response stays valid
+        self.max_entries = max_entries  # Per-session capacity before LRU eviction
+        self.namespaces: Dict[str, _Namespace] = {}
+        # Requests run in a thread pool, and add() can compact or drop any
+        # session's namespace, so one lock guards the dict and every namespace
+        self._lock = threading.Lock()
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Embed a query as an L2-normalized float32 vector"""
+        q = np.asarray(self.embed([query])[0], dtype=np.float32)
+        # A zero vector stays zero, scoring 0 against everything, instead of NaN
+        return q / (float(np.linalg.norm(q)) or 1.0)
+
+    def lookup(
+        self, session_id: Optional[str], q: np.ndarray
+    ) -> Optional[Tuple[str, List]]:
+        """Return the cached (response, sources) closest to q, if similar enough"""
+        with self._lock:
+            key = session_id or ""
+            namespace = self.namespaces.get(key)
+            if namespace is None:
+                return None
+
+            now = time.monotonic()
+            self._expire(namespace, now)
+            if not namespace.entries:
+                del self.namespaces[key]
+                return None
+
+            # Embeddings are normalized, so matrix-vector products give cosines
+            M = namespace.M[: namespace.n]
+            sims = np.empty(namespace.n, dtype=np.float32)
+            for start in range(0, namespace.n, SCAN_BLOCK_ROWS):
+                block = M[start : start + SCAN_BLOCK_ROWS]
+                sims[start : start + SCAN_BLOCK_ROWS] = block.astype(np.float32) @ q
+            idx = int(np.argmax(sims))
+            if sims[idx] < self.threshold:
+                return None
+
+            namespace.last_used[idx] = now
+            return namespace.entries[idx]
+
+    def add(
+        self, session_id: Optional[str], q: np.ndarray, response: str, sources: List
+    ):
+        """Cache a generated response under its query embedding"""
+        with self._lock:
+            now = time.monotonic()
+            key = session_id or ""
+            namespace = self.namespaces.get(key)
+            if namespace is None:
+                # Sessions nobody looks up again would otherwise be kept forever
+                self._drop_expired_namespaces(now)
+                namespace = self.namespaces[key] = _Namespace(
+                    q.shape[0], self.max_entries
+                )
+
+            self._expire(namespace, now)
+
+            # Evict the least recently used entry when the session is at capacity
+            if namespace.n >= self.max_entries:
+                namespace.remove([int(np.argmin(namespace.last_used))])
+
+            namespace.append(q, (response, list(sources)), now)
+
+    def clear(self):
+        """Drop all cached responses"""
+        with self._lock:
+            self.namespaces = {}
+
+    def _drop_expired_namespaces(self, now: float):
+        """Expire entries in every session and forget the sessions left empty"""
+        for key, namespace in list(self.namespaces.items()):
+            self._expire(namespace, now)
+            if not namespace.entries:
+                del self.namespaces[key]
+
+    def _expire(self, namespace: _Namespace, now: float):
+        """Remove entries older than the TTL"""
+        expired = [
+            row
+            for row, created in enumerate(namespace.created)
+            if now - created > self.ttl
+        ]
+        if expired:
+            namespace.remove(expired)
@@ -1,38 +1,126 @@
-from typing import List, Tuple, Optional, Dict
+from typing import Iterator, List, Tuple, Optional, Dict
 import os
 import re
-from document_processor import DocumentProcessor
+import sys
+import threading
+from bisect import bisect_right
+import ahocorasick
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from document_processor import DocumentProcessor, ProcessingResult
 from vector_store import VectorStore
 from ai_generator import AIGenerator
 from session_manager import SessionManager
 from search_tools import ToolManager, CourseSearchTool, CourseOutlineTool
+from query_cache import SemanticQueryCache
 from models import Course, Lesson, CourseChunk
 
+__all__ = ["RAGSystem"]
+
 
 class RAGSystem:
     """Main orchestrator for the Retrieval-Augmented Generation system"""
 
+    # Existing markdown links, whose text and URL are never rewritten
+    MARKDOWN_LINK_PATTERN = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+
+    # "Lesson X" or "lesson X" (case insensitive for 'lesson')
+    LESSON_PATTERN = re.compile(r"\b([Ll]esson)\s+(\d+)\b")
+
     def __init__(self, config):
         self.config = config
 
-        # Initialize core components
+        # Initialize lightweight components; the vector store, AI generator
+        # and tools are built on first use (see the properties below)
         self.document_processor = DocumentProcessor(
             config.CHUNK_SIZE, config.CHUNK_OVERLAP
         )
-        self.vector_store = VectorStore(
-            config.CHROMA_PATH, config.EMBEDDING_MODEL, config.MAX_RESULTS
+        self.session_manager = SessionManager(config.MAX_HISTORY)
+
+        # Guards lazy construction; reentrant since tools need the vector store
+        self._init_lock = threading.RLock()
+
+        # Course title matcher, rebuilt when the catalog version changes
+        self._link_cache = {"version": -1, "automaton": None, "link_map": {}}
+
+        # Background thread for warming link context during the AI call; it
+        # shares VectorStore's locked catalog cache with tool calls and swaps
+        # _link_cache whole, so no other state needs guarding
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=2)
+
+    def _get_or_create(self, name: str, factory):
+        """Build a component once, even when several threads ask at once"""
+        component = self.__dict__.get(name)
+        if component is None:
+            with self._init_lock:
+                if name not in self.__dict__:
+                    self.__dict__[name] = factory()
+                component = self.__dict__[name]
+        return component
+
+    @property
+    def vector_store(self) -> VectorStore:
+        """Vector store; opening Chroma and loading the embedding model is slow"""
+        return self._get_or_create(
+            "_vector_store",
+            lambda: VectorStore(
+                self.config.CHROMA_PATH,
+                self.config.EMBEDDING_MODEL,
+                self.config.MAX_RESULTS,
+                embedding_cache_path=self.config.EMBEDDING_CACHE_PATH,
+            ),
+        )
+
+    @property
+    def ai_generator(self) -> AIGenerator:
+        """Claude API client, only needed once queries are served"""
+        return self._get_or_create(
+            "_ai_generator",
+            lambda: AIGenerator(
+                self.config.ANTHROPIC_API_KEY, self.config.ANTHROPIC_MODEL
+            ),
         )
-        self.ai_generator = AIGenerator(
-            config.ANTHROPIC_API_KEY, config.ANTHROPIC_MODEL
+
+    @property
+    def search_tool(self) -> CourseSearchTool:
+        """Course content search tool"""
+        return self._get_or_create(
+            "_search_tool", lambda: CourseSearchTool(self.vector_store)
         )
-        self.session_manager = SessionManager(config.MAX_HISTORY)
 
-        # Initialize search tools
-        self.tool_manager = ToolManager()
-        self.search_tool = CourseSearchTool(self.vector_store)
-        self.tool_manager.register_tool(self.search_tool)
-        self.outline_tool = CourseOutlineTool(self.vector_store)
-        self.tool_manager.register_tool(self.outline_tool)
+    @property
+    def outline_tool(self) -> CourseOutlineTool:
+        """Course outline tool"""
+        return self._get_or_create(
+            "_outline_tool", lambda: CourseOutlineTool(self.vector_store)
+        )
+
+    @property
+    def tool_manager(self) -> ToolManager:
+        """Tool manager with the search tools registered"""
+        return self._get_or_create("_tool_manager", self._create_tool_manager)
+
+    def _create_tool_manager(self) -> ToolManager:
+        """Initialize search tools"""
+        tool_manager = ToolManager()
+        tool_manager.register_tool(self.search_tool)
+        tool_manager.register_tool(self.outline_tool)
+        return tool_manager
+
+    @property
+    def query_cache(self) -> Optional[SemanticQueryCache]:
+        """Optional cache of responses for repeated questions within a session"""
+        if not self.config.SEMANTIC_CACHE_ENABLED:
+            return None
+        return self._get_or_create(
+            "_query_cache",
+            lambda: SemanticQueryCache(
+                self.vector_store.embed,
+                threshold=self.config.SEMANTIC_CACHE_THRESHOLD,
+                ttl=self.config.SEMANTIC_CACHE_TTL,
+                max_entries=self.config.SEMANTIC_CACHE_MAX_ENTRIES,
+            ),
+        )
 
     def add_course_document(self, file_path: str) -> Tuple[Course, int]:
         """
@@ -56,6 +144,10 @@ class RAGSystem:
             # Add course content chunks to vector store
             self.vector_store.add_course_content(course_chunks)
 
+            # Cached answers may not reflect the new course
+            if self.query_cache:
+                self.query_cache.clear()
+
             return course, len(course_chunks)
         except Exception as e:
             print(f"Error processing course document {file_path}: {e}")
@@ -87,38 +179,98 @@ class RAGSystem:
             return 0, 0
 
         # Get existing course titles to avoid re-processing
-        existing_course_titles = set(self.vector_store.get_existing_course_titles())
-
-        # Process each file in the folder
-        for file_name in os.listdir(folder_path):
-            file_path = os.path.join(folder_path, file_name)
-            if os.path.isfile(file_path) and file_name.lower().endswith(
-                (".pdf", ".docx", ".txt")
-            ):
-                try:
-                    # Check if this course might already exist
-                    # We'll process the document to get the course ID, but only add if new
-                    course, course_chunks = (
-                        self.document_processor.process_course_document(file_path)
-                    )
-
-                    if course and course.title not in existing_course_titles:
-                        # This is a new course - add it to the vector store
-                        self.vector_store.add_course_metadata(course)
-                        self.vector_store.add_course_content(course_chunks)
-                        total_courses += 1
-                        total_chunks += len(course_chunks)
-                        print(
-                            f"Added new course: {course.title} ({len(course_chunks)} chunks)"
-                        )
-                        existing_course_titles.add(course.title)
-                    elif course:
-                        print(f"Course already exists: {course.title} - skipping")
-                except Exception as e:
-                    print(f"Error processing {file_name}: {e}")
+        # Interned so repeated membership checks compare by identity first
+        existing_course_titles = {
+            sys.intern(title)
+            for title in self.vector_store.get_existing_course_titles()
+        }
+
+        # scandir entries carry their file type, saving a stat() per file
+        with os.scandir(folder_path) as entries:
+            candidate_files = [
+                (entry.name, entry.path)
+                for entry in entries
+                if entry.is_file()
+                and entry.name.lower().endswith((".pdf", ".docx", ".txt"))
+            ]
+
+        file_paths = []
+        failed = []  # ProcessingResults for files that could not be ingested
+        for file_name, file_path in candidate_files:
+            # Skip known courses from the file header, before the full parse
+            try:
+                title = self.document_processor.peek_course_title(file_path)
+            except Exception as e:
+                failed.append(ProcessingResult(False, None, [], str(e), file_path))
+                continue
+            if title in existing_course_titles:
+                print(f"Course already exists: {title} - skipping")
+                continue
+
+            file_paths.append(file_path)
+
+        if not file_paths:
+            self._report_failures(failed)
+            return 0, 0
+
+        # Parse and chunk documents in parallel - this is CPU-bound work.
+        # Spawn rather than fork since this process already holds model threads.
+        max_workers = min(len(file_paths), max(1, (os.cpu_count() or 2) - 1))
+        new_courses = []
+        new_chunks = []
+        with ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            # Workers never raise; failures come back as results
+            results = list(
+                executor.map(self.document_processor.safe_process, file_paths)
+            )
+
+        for result in results:
+            if not result.ok:
+                failed.append(result)
+                continue
+
+            course, course_chunks = result.course, result.chunks
+            if not course:
+                continue
+
+            # Shared with the link caches keyed by title downstream
+            course.title = sys.intern(course.title)
+
+            if course.title not in existing_course_titles:
+                # This is a new course - stored with the others below
+                new_courses.append(course)
+                new_chunks.extend(course_chunks)
+                total_courses += 1
+                total_chunks += len(course_chunks)
+                print(f"Added new course: {course.title} ({len(course_chunks)} chunks)")
+                existing_course_titles.add(course.title)
+            else:
+                print(f"Course already exists: {course.title} - skipping")
+
+        self._report_failures(failed)
+
+        # Embed and store all new courses and their content in one batch each
+        self.vector_store.add_course_metadata_bulk(new_courses)
+        self.vector_store.add_course_content(new_chunks)
+
+        # Cached answers may not reflect the new courses
+        if total_courses and self.query_cache:
+            self.query_cache.clear()
 
         return total_courses, total_chunks
 
+    def _report_failures(self, failed: List[ProcessingResult]):
+        """Log every file that failed to ingest in a single write"""
+        if failed:
+            print(
+                "\n".join(
+                    f"Error processing {os.path.basename(result.file)}: {result.error}"
+                    for result in failed
+                )
+            )
+
     def query(
         self, query: str, session_id: Optional[str] = None
     ) -> Tuple[str, List[str]]:
@@ -132,6 +284,17 @@ class RAGSystem:
         Returns:
             Tuple of (response, sources list - empty for tool-based approach)
         """
+        # Serve repeated questions from the semantic cache when enabled
+        query_embedding = None
+        if self.query_cache:
+            query_embedding = self.query_cache.embed_query(query)
+            cached = self.query_cache.lookup(session_id, query_embedding)
+            if cached:
+                response, sources = cached
+                if session_id:
+                    self.session_manager.add_exchange(session_id, query, response)
+                return response, sources
+
         # Create prompt for the AI with clear instructions
         prompt = f"""Answer this question about course materials: {query}"""
 
@@ -140,6 +303,9 @@ class RAGSystem:
         if session_id:
             history = self.session_manager.get_conversation_history(session_id)
 
+        # Fetch course link metadata while the AI generates the response
+        link_context = self._prefetch_pool.submit(self._get_link_matcher)
+
         # Generate response using AI with tools
         response = self.ai_generator.generate_response(
             query=prompt,
@@ -151,11 +317,9 @@ class RAGSystem:
         # Get sources from the search tool
         sources = self.tool_manager.get_last_sources()
 
-        # Add course links to response text
-        response = self._add_course_links(response)
-
-        # Add lesson links to response text (uses sources for course context)
-        response = self._add_lesson_links(response, sources)
+        # Add course and lesson links to response text (uses sources for
+        # lesson course context)
+        response = self._add_links(response, sources, link_context.result())
 
         # Reset sources after retrieving them
         self.tool_manager.reset_sources()
@@ -164,9 +328,91 @@ class RAGSystem:
         if session_id:
             self.session_manager.add_exchange(session_id, query, response)
 
+        # Cache the final response for near-duplicate follow-ups
+        if self.query_cache:
+            self.query_cache.add(session_id, query_embedding, response, sources)
+
         # Return response with sources from tool searches
         return response, sources
 
+    def query_stream(
+        self, query: str, session_id: Optional[str] = None
+    ) -> Iterator[Tuple[str, Optional[List]]]:
+        """
+        Process a user query like query(), streaming the response as it arrives.
+
+        Each completed paragraph is linked and yielded as soon as it is seen.
+
+        Args:
+            query: User's question
+            session_id: Optional session ID for conversation context
+
+        Yields:
+            (paragraph, None) for each linked paragraph, then ("", sources)
+            once the response is complete
+        """
+        # Serve repeated questions from the semantic cache when enabled
+        query_embedding = None
+        if self.query_cache:
+            query_embedding = self.query_cache.embed_query(query)
+            cached = self.query_cache.lookup(session_id, query_embedding)
+            if cached:
+                response, sources = cached
+                if session_id:
+                    self.session_manager.add_exchange(session_id, query, response)
+                yield response, None
+                yield "", sources
+                return
+
+        prompt = f"""Answer this question about course materials: {query}"""
+
+        history = None
+        if session_id:
+            history = self.session_manager.get_conversation_history(session_id)
+
+        # Fetch course link metadata once, before the first paragraph completes
+        link_future = self._prefetch_pool.submit(self._get_link_matcher)
+
+        deltas = self.ai_generator.generate_response_stream(
+            query=prompt,
+            conversation_history=history,
+            tools=self.tool_manager.get_tool_definitions(),
+            tool_manager=self.tool_manager,
+        )
+
+        linked_paragraphs = []
+        buffer = ""
+        for delta in deltas:
+            buffer += delta
+            while "\n\n" in buffer:
+                paragraph, buffer = buffer.split("\n\n", 1)
+                # Tools have run by the time answer text streams, so the
+                # sources for lesson links are already known
+                linked = self._add_links(
+                    paragraph + "\n\n",
+                    self.tool_manager.get_last_sources(),
+                    link_future.result(),
+                )
+                linked_paragraphs.append(linked)
+                yield linked, None
+
+        sources = self.tool_manager.get_last_sources()
+        if buffer:
+            linked = self._add_links(buffer, sources, link_future.result())
+            linked_paragraphs.append(linked)
+            yield linked, None
+
+        self.tool_manager.reset_sources()
+
+        response = "".join(linked_paragraphs)
+        if session_id:
+            self.session_manager.add_exchange(session_id, query, response)
+
+        if self.query_cache:
+            self.query_cache.add(session_id, query_embedding, response, sources)
+
+        yield "", sources
+
     def get_course_analytics(self) -> Dict:
         """Get analytics about the course catalog"""
         return {
@@ -174,51 +420,125 @@ class RAGSystem:
             "course_titles": self.vector_store.get_existing_course_titles(),
         }
 
-    def _add_course_links(self, response: str) -> str:
-        """Replace course title mentions with markdown links"""
-        # Get all courses with their links
-        all_courses = self.vector_store.get_all_courses_metadata()
+    def close(self):
+        """Stop the background prefetch threads"""
+        self._prefetch_pool.shutdown(wait=True)
 
-        # Sort by title length (longest first) to avoid partial replacements
-        # e.g., "MCP" shouldn't match inside "MCP: Build Rich-Context..."
-        all_courses.sort(key=lambda c: len(c["title"]), reverse=True)
-
-        # Replace each course mention with a link
-        for course in all_courses:
-            title = course["title"]
-            link = course.get("course_link")
-            if not link:
-                continue
+    def _add_links(self, response: str, sources: List[Dict], link_context=None) -> str:
+        """
+        Replace course title and lesson mentions (e.g., 'Lesson 6') with
+        markdown links in a single pass over the response.
 
-            # Skip if already a markdown link
-            if f"[{title}]" in response:
-                continue
+        Uses course context from sources to determine which course the lessons belong to.
+        link_context is a prefetched (automaton, link_map) from _get_link_matcher.
+        """
+        automaton, link_map = link_context or self._get_link_matcher()
+        primary_course = self._get_primary_course(sources)
+
+        # Collect candidates as (start, end, course title, lesson match)
+        candidates = []
+        if automaton is not None:
+            for end_idx, (title, length) in automaton.iter(response):
+                candidates.append((end_idx - length + 1, end_idx + 1, title, None))
+        for match in self.LESSON_PATTERN.finditer(response):
+            candidates.append((match.start(), match.end(), None, match))
+        if not candidates:
+            return response
 
-            # Match title with optional surrounding quotes
-            # Handles: "Course Name" or Course Name
-            pattern = rf'"{re.escape(title)}"|{re.escape(title)}'
+        # Leftmost-longest wins, e.g., "MCP" shouldn't match inside
+        # "MCP: Build Rich-Context..."
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
 
-            # Replace with markdown link (removing quotes if present)
-            def replace_with_link(_):
-                return f"[{title}]({link})"
+        # Locate existing markdown links once; matches inside them are skipped
+        # and titles already used as link text are left alone
+        existing_links = list(self.MARKDOWN_LINK_PATTERN.finditer(response))
+        link_spans = [m.span() for m in existing_links]
+        link_starts = [start for start, _ in link_spans]
+        already_linked = {m.group(1) for m in existing_links}
 
-            response = re.sub(pattern, replace_with_link, response)
+        # First pass: keep non-overlapping matches outside existing links
+        selected = []
+        pos = 0
+        for start, end, title, lesson_match in candidates:
+            if start < pos:
+                continue  # Overlaps a match already taken
 
-        return response
+            # Check if already inside a markdown link
+            i = bisect_right(link_starts, start) - 1
+            if i >= 0 and start < link_spans[i][1]:
+                continue
 
-    def _add_lesson_links(self, response: str, sources: List[Dict]) -> str:
-        """
-        Replace lesson mentions (e.g., 'Lesson 6') with markdown links.
+            selected.append((start, end, title, lesson_match))
+            pos = end
 
-        Uses course context from sources to determine which course the lessons belong to.
-        """
-        if not sources:
-            return response
+        # Fetch links for every mentioned lesson with one lookup
+        lesson_links = {}
+        lesson_nums = {int(c[3].group(2)) for c in selected if c[3] is not None}
+        if primary_course and lesson_nums:
+            lesson_links = self.vector_store.get_lesson_links_bulk(
+                primary_course, lesson_nums
+            )
 
+        # Second pass: splice in the links, with no lookups left
+        segments = []
+        pos = 0
+        for start, end, title, lesson_match in selected:
+            if title is not None:
+                if title in already_linked:
+                    continue
+                link = f"[{title}]({link_map[title]})"
+            else:
+                lesson_word = lesson_match.group(1)  # Preserves original case
+                lesson_num = int(lesson_match.group(2))
+                lesson_link = lesson_links.get(lesson_num)
+                if not lesson_link:
+                    continue  # No link found, keep original
+                link = f"[{lesson_word} {lesson_num}]({lesson_link})"
+
+            segments.append(response[pos:start])
+            segments.append(link)
+            pos = end
+
+        segments.append(response[pos:])
+        return "".join(segments)
+
+    def _get_link_matcher(self):
+        """Return an Aho-Corasick automaton over linked course titles"""
+        catalog_version = self.vector_store.catalog_version
+        link_cache = self._link_cache
+        if link_cache["version"] != catalog_version:
+            all_courses = self.vector_store.get_all_courses_metadata()
+            link_map = {
+                course["title"]: course["course_link"]
+                for course in all_courses
+                if course.get("course_link")
+            }
+
+            # Each title also matches with surrounding quotes, which are
+            # dropped in the link: "Course Name" -> [Course Name](...)
+            automaton = None
+            if link_map:
+                automaton = ahocorasick.Automaton()
+                for title in link_map:
+                    automaton.add_word(title, (title, len(title)))
+                    automaton.add_word(f'"{title}"', (title, len(title) + 2))
+                automaton.make_automaton()
+
+            # Replaced as a whole so concurrent queries never see a mix
+            link_cache = self._link_cache = {
+                "version": catalog_version,
+                "automaton": automaton,
+                "link_map": link_map,
+            }
+
+        return link_cache["automaton"], link_cache["link_map"]
+
+    def _get_primary_course(self, sources: List[Dict]) -> Optional[str]:
+        """Get the course most sources come from, for resolving lesson links"""
         # Extract course titles from sources
         # Source text format: "Course Title - Lesson N" or just "Course Title"
         course_titles = []
-        for source in sources:
+        for source in sources or []:
             text = source.get("text", "")
             if " - Lesson" in text:
                 course_title = text.split(" - Lesson")[0]
@@ -228,35 +548,9 @@ class RAGSystem:
                 course_titles.append(course_title)
 
         if not course_titles:
-            return response
-
-        # Get the most common course title (handles multi-course scenarios)
-        from collections import Counter
-
-        course_counter = Counter(course_titles)
-        primary_course = course_counter.most_common(1)[0][0]
-
-        # Pattern to match "Lesson X" or "lesson X" (case insensitive for 'lesson')
-        pattern = r"\b([Ll]esson)\s+(\d+)\b"
-
-        def replace_with_link(match):
-            lesson_word = match.group(1)  # Preserves original case
-            lesson_num = int(match.group(2))
-
-            # Check if already inside a markdown link
-            # Look for preceding [ that would indicate this is link text
-            start = match.start()
-            prefix = response[max(0, start - 50) : start]
-            if "[" in prefix and "](" not in prefix[prefix.rfind("[") :]:
-                # Inside a markdown link text, don't replace
-                return match.group(0)
-
-            # Get lesson link from vector store
-            lesson_link = self.vector_store.get_lesson_link(primary_course, lesson_num)
-
-            if lesson_link:
-                return f"[{lesson_word} {lesson_num}]({lesson_link})"
-            else:
-                return match.group(0)  # No link found, keep original
+            return None
 
-        return re.sub(pattern, replace_with_link, response)
+        # Get the most common course title (handles multi-course scenarios).
+        # Sources are capped at MAX_RESULTS, so counting in place beats a Counter;
+        # ties go to the first title seen, as with Counter.most_common
+        return max(course_titles, key=course_titles.count)
@@ -0,0 +1,36 @@
+from typing import List, Dict, Any, Optional
+from dataclasses import dataclass
+
+
+@dataclass
+class SearchResults:
+    """Container for search results with metadata"""
+
+    documents: List[str]
+    metadata: List[Dict[str, Any]]
+    distances: List[float]
+    error: Optional[str] = None
+
+    @classmethod
+    def from_chroma(cls, chroma_results: Dict) -> "SearchResults":
+        """Create SearchResults from ChromaDB query results"""
+        return cls(
+            documents=(
+                chroma_results["documents"][0] if chroma_results["documents"] else []
+            ),
+            metadata=(
+                chroma_results["metadatas"][0] if chroma_results["metadatas"] else []
+            ),
+            distances=(
+                chroma_results["distances"][0] if chroma_results["distances"] else []
+            ),
+        )
+
+    @classmethod
+    def empty(cls, error_msg: str) -> "SearchResults":
+        """Create empty results with error message"""
+        return cls(documents=[], metadata=[], distances=[], error=error_msg)
+
+    def is_empty(self) -> bool:
+        """Check if results are empty"""
+        return len(self.documents) == 0
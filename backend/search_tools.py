@@ -1,6 +1,10 @@
 from typing import Dict, Any, Optional, Protocol
 from abc import ABC, abstractmethod
-from vector_store import VectorStore, SearchResults
+from search_results import SearchResults
+from vector_store import VectorStore
+
+# Start of the message returned when a search finds nothing
+EMPTY_RESULT_MSG = "No relevant content found"
 
 
 class Tool(ABC):
@@ -83,7 +87,7 @@ class CourseSearchTool(Tool):
                 filter_info += f" in course '{course_name}'"
             if lesson_number:
                 filter_info += f" in lesson {lesson_number}"
-            return f"No relevant content found{filter_info}."
+            return f"{EMPTY_RESULT_MSG}{filter_info}."
 
         # Format and return results
         return self._format_results(results)
@@ -217,6 +221,7 @@ class ToolManager:
 
     def __init__(self):
         self.tools = {}
+        self._tool_definitions = None  # Built on first use, reset on registration
 
     def register_tool(self, tool: Tool):
         """Register any tool that implements the Tool interface"""
@@ -225,10 +230,16 @@ class ToolManager:
         if not tool_name:
             raise ValueError("Tool must have a 'name' in its definition")
         self.tools[tool_name] = tool
+        self._tool_definitions = None
 
     def get_tool_definitions(self) -> list:
         """Get all tool definitions for Anthropic tool calling"""
-        return [tool.get_tool_definition() for tool in self.tools.values()]
+        # Tools rarely change after startup, so reuse the same list every query
+        if self._tool_definitions is None:
+            self._tool_definitions = [
+                tool.get_tool_definition() for tool in self.tools.values()
+            ]
+        return self._tool_definitions
 
     def execute_tool(self, tool_name: str, **kwargs) -> str:
         """Execute a tool by name with given parameters"""
@@ -3,46 +3,109 @@ Shared fixtures for RAG chatbot backend tests.
 """
 
 import pytest
-import sys
-import os
-from unittest.mock import Mock, MagicMock, patch
-from dataclasses import dataclass
+import zlib
+from unittest.mock import Mock  # Not MagicMock: it sets up every magic method
+from dataclasses import dataclass, field
+from types import SimpleNamespace
 from typing import List, Dict, Any, Optional
 
-# Add backend to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from chromadb.api.types import Documents, EmbeddingFunction
 
-from vector_store import SearchResults
+from search_results import SearchResults
 from models import Course, Lesson, CourseChunk
 
 
+# === Slow Test Gating ===
+def pytest_addoption(parser):
+    parser.addoption(
+        "--runslow", action="store_true", default=False, help="run slow tests"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked slow unless --runslow is given"""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="need --runslow option to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
 # === API Testing Fixtures ===
-@pytest.fixture
-def mock_rag_system():
-    """Creates a mock RAGSystem for API testing"""
-    mock_system = Mock()
-    mock_system.session_manager = Mock()
-    mock_system.session_manager.create_session.return_value = "test-session-123"
-    mock_system.query.return_value = (
-        "Python is a versatile programming language.",
-        [{"text": "Introduction to Python - Lesson 1", "link": "https://example.com/python/1"}]
+@dataclass(frozen=True, slots=True)
+class RagSystemStub:
+    """
+    Stands in for RAGSystem in API tests with plain methods instead of a Mock.
+
+    Calls are recorded in order as (method, *args) tuples. Vary the canned
+    returns per test with dataclasses.replace.
+    """
+
+    answer: str = "Python is a versatile programming language."
+    sources: tuple = (
+        {
+            "text": "Introduction to Python - Lesson 1",
+            "link": "https://example.com/python/1",
+        },
+    )
+    stream_chunks: tuple = ()  # (text, sources) pairs yielded by query_stream
+    analytics: Any = field(
+        default_factory=lambda: {
+            "total_courses": 3,
+            "course_titles": [
+                "Introduction to Python",
+                "Machine Learning Basics",
+                "Web Development",
+            ],
+        }
     )
-    mock_system.get_course_analytics.return_value = {
-        "total_courses": 3,
-        "course_titles": ["Introduction to Python", "Machine Learning Basics", "Web Development"]
-    }
-    return mock_system
+    new_session_id: str = "test-session-123"
+    query_error: Optional[Exception] = None  # Raised by query and query_stream
+    analytics_error: Optional[Exception] = None
+    calls: list = field(default_factory=list, init=False)
+
+    @property
+    def session_manager(self):
+        """The stub doubles as its own session manager"""
+        return self
+
+    def create_session(self):
+        self.calls.append(("create_session",))
+        return self.new_session_id
+
+    def query(self, query, session_id):
+        self.calls.append(("query", query, session_id))
+        if self.query_error:
+            raise self.query_error
+        return self.answer, list(self.sources)
+
+    def query_stream(self, query, session_id):
+        self.calls.append(("query_stream", query, session_id))
+        if self.query_error:
+            raise self.query_error
+        return iter(self.stream_chunks)
+
+    def get_course_analytics(self):
+        self.calls.append(("get_course_analytics",))
+        if self.analytics_error:
+            raise self.analytics_error
+        return self.analytics
+
+
+@pytest.fixture(scope="module")
+def mock_rag_system():
+    """Creates a stub RAGSystem for API testing"""
+    return RagSystemStub()
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def mock_rag_system_error():
-    """Creates a mock RAGSystem that raises exceptions"""
-    mock_system = Mock()
-    mock_system.session_manager = Mock()
-    mock_system.session_manager.create_session.return_value = "test-session-123"
-    mock_system.query.side_effect = Exception("Database connection failed")
-    mock_system.get_course_analytics.side_effect = Exception("Analytics unavailable")
-    return mock_system
+    """Creates a stub RAGSystem that raises exceptions"""
+    return RagSystemStub(
+        query_error=Exception("Database connection failed"),
+        analytics_error=Exception("Analytics unavailable"),
+    )
 
 
 # === Mock Configuration ===
@@ -57,15 +120,28 @@ class MockConfig:
     CHUNK_OVERLAP: int = 100
     MAX_RESULTS: int = 5  # Correct value
     MAX_HISTORY: int = 2
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_TTL: int = 300
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 128
     CHROMA_PATH: str = "./test_chroma_db"
+    EMBEDDING_CACHE_PATH: str = ""
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def mock_config():
     """Provides a test configuration with correct MAX_RESULTS"""
     return MockConfig()
 
 
+@pytest.fixture(scope="session")
+def prod_config():
+    """The production config singleton from config.py, imported once"""
+    from config import config
+
+    return config
+
+
 @pytest.fixture
 def broken_config():
     """Provides configuration that reproduces the bug (MAX_RESULTS=0)"""
@@ -75,7 +151,7 @@ def broken_config():
 
 
 # === Sample Data Fixtures ===
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_course():
     """Sample course with lessons for testing"""
     return Course(
@@ -97,7 +173,7 @@ def sample_course():
     )
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_chunks(sample_course):
     """Sample course chunks for testing"""
     return [
@@ -116,7 +192,7 @@ def sample_chunks(sample_course):
     ]
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def sample_search_results():
     """Sample SearchResults for testing tool execution"""
     return SearchResults(
@@ -129,150 +205,409 @@ def sample_search_results():
     )
 
 
-@pytest.fixture
+# Shared sentinels; consumers only read them, so empty tuples stand in for lists
+EMPTY_SEARCH_RESULTS = SearchResults(
+    documents=(), metadata=(), distances=(), error=None
+)
+ERROR_SEARCH_RESULTS = SearchResults(
+    documents=(), metadata=(), distances=(), error="Search error: connection failed"
+)
+
+
+@pytest.fixture(scope="session")
 def empty_search_results():
     """Empty SearchResults for testing no-results scenario"""
-    return SearchResults(documents=[], metadata=[], distances=[], error=None)
+    return EMPTY_SEARCH_RESULTS
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def error_search_results():
     """SearchResults with error for testing error handling"""
-    return SearchResults(
-        documents=[], metadata=[], distances=[], error="Search error: connection failed"
-    )
+    return ERROR_SEARCH_RESULTS
 
 
 # === Mock VectorStore ===
-@pytest.fixture
+SAMPLE_CATALOG_QUERY_RESULT = {
+    "documents": [["Introduction to Python"]],
+    "metadatas": [
+        [
+            {
+                "title": "Introduction to Python",
+                "course_link": "https://example.com/python",
+                "lessons_json": '[{"lesson_number": 1, "lesson_title": "Getting Started", "lesson_link": "https://example.com/python/1"}]',
+            }
+        ]
+    ],
+    "distances": [[0.1]],
+}
+
+
+class _StubVectorStore:
+    """Plain VectorStore stand-in for tests that only need canned return values"""
+
+    def __init__(self, search_results, catalog_query_result):
+        # Tests reassign search_results and catalog_query_result to change what
+        # search() and course_catalog.query() return; reset() restores these
+        self._defaults = (search_results, catalog_query_result)
+        self.course_catalog = SimpleNamespace(
+            query=lambda **kwargs: self.catalog_query_result
+        )
+        self.reset()
+
+    def reset(self):
+        """Restore the canned results a test may have reassigned"""
+        self.search_results, self.catalog_query_result = self._defaults
+
+    def search(self, *args, **kwargs):
+        return self.search_results
+
+    def get_lesson_link(self, *args, **kwargs):
+        return "https://example.com/python/1"
+
+
+@pytest.fixture(scope="session")
 def mock_vector_store(sample_search_results):
-    """Creates a mock VectorStore that returns sample results"""
+    """Creates a stub VectorStore that returns sample results"""
+    return _StubVectorStore(sample_search_results, SAMPLE_CATALOG_QUERY_RESULT)
+
+
+@pytest.fixture(scope="session")
+def mock_vector_store_spied(sample_search_results):
+    """Creates a mock VectorStore for tests that assert on calls"""
     mock_store = Mock()
     mock_store.search.return_value = sample_search_results
     mock_store.get_lesson_link.return_value = "https://example.com/python/1"
-    mock_store.course_catalog = Mock()
-    mock_store.course_catalog.query.return_value = {
-        "documents": [["Introduction to Python"]],
-        "metadatas": [
-            [
-                {
-                    "title": "Introduction to Python",
-                    "course_link": "https://example.com/python",
-                    "lessons_json": '[{"lesson_number": 1, "lesson_title": "Getting Started", "lesson_link": "https://example.com/python/1"}]',
-                }
-            ]
-        ],
-        "distances": [[0.1]],
-    }
+    mock_store.course_catalog.query.return_value = SAMPLE_CATALOG_QUERY_RESULT
     return mock_store
 
 
+@pytest.fixture(autouse=True)
+def _reset_shared_vector_stores(mock_vector_store, mock_vector_store_spied):
+    """Undo per-test overrides and recorded calls on the session vector stores"""
+    yield
+    mock_vector_store.reset()
+    # Keep the configured return values; only calls and side effects are cleared
+    mock_vector_store_spied.reset_mock(side_effect=True)
+
+
+# === Fake ChromaDB ===
+class FakeCollection:
+    """Dict-backed stand-in for a Chroma collection; every query hit is at distance 0"""
+
+    def __init__(self):
+        self.records: Dict[str, tuple] = {}  # id -> (document, metadata)
+
+    def add(self, ids, documents, metadatas, embeddings=None):
+        for id_, doc, meta in zip(ids, documents, metadatas):
+            self.records.setdefault(id_, (doc, meta))  # Chroma ignores existing ids
+
+    def get(self, ids=None):
+        keys = (
+            list(self.records) if ids is None else [i for i in ids if i in self.records]
+        )
+        return {
+            "ids": keys,
+            "documents": [self.records[k][0] for k in keys],
+            "metadatas": [self.records[k][1] for k in keys],
+        }
+
+    def count(self):
+        return len(self.records)
+
+    def query(self, n_results, where=None, **kwargs):
+        hits = [r for r in self.records.values() if _matches(r[1], where)][:n_results]
+        return {
+            "documents": [[doc for doc, _ in hits]],
+            "metadatas": [[meta for _, meta in hits]],
+            "distances": [[0.0] * len(hits)],
+        }
+
+
+def _matches(metadata, where):
+    """Evaluate the equality and $and filters VectorStore builds"""
+    if where is None:
+        return True
+    if "$and" in where:
+        return all(_matches(metadata, clause) for clause in where["$and"])
+    return all(metadata.get(k) == v for k, v in where.items())
+
+
+class FakeChromaClient:
+    """Stand-in for chromadb.PersistentClient holding FakeCollections by name"""
+
+    def __init__(self, **kwargs):
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def get_or_create_collection(self, name, embedding_function=None):
+        return self.collections.setdefault(name, FakeCollection())
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+    def get_max_batch_size(self):
+        return 5461
+
+
+class StubEmbedding(EmbeddingFunction[Documents]):
+    """Deterministic hash-to-vector embeddings; for tests where ranking is irrelevant"""
+
+    DIM = 32  # Narrower than MiniLM's 384; the tests never rely on ranking
+
+    def __init__(self):
+        pass
+
+    def __call__(self, input: Documents):
+        return [
+            [(zlib.crc32(text.encode()) & 0xFFFF) / 65535.0] * self.DIM
+            for text in input
+        ]
+
+    @staticmethod
+    def name():
+        return "stub-hash"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return StubEmbedding()
+
+
+@pytest.fixture(scope="session")
+def stub_embedding():
+    """A shared StubEmbedding; it holds no state"""
+    return StubEmbedding()
+
+
+@pytest.fixture
+def fake_vs(monkeypatch, stub_embedding):
+    """A VectorStore over FakeChromaClient, with no embedding model to load"""
+    import chromadb
+    from chromadb.utils import embedding_functions
+    from vector_store import VectorStore
+
+    monkeypatch.setattr(chromadb, "PersistentClient", FakeChromaClient)
+    monkeypatch.setattr(
+        embedding_functions,
+        "SentenceTransformerEmbeddingFunction",
+        lambda model_name: stub_embedding,
+    )
+    return VectorStore("unused", "all-MiniLM-L6-v2", max_results=5)
+
+
+@pytest.fixture
+def mock_chroma_vs(monkeypatch):
+    """A VectorStore over Mock collections, for asserting on the Chroma calls"""
+    import chromadb
+    from chromadb.utils import embedding_functions
+    from vector_store import VectorStore
+
+    client = Mock()
+    client.get_max_batch_size.return_value = 100
+    collections = {"course_catalog": Mock(), "course_content": Mock()}
+    client.get_or_create_collection.side_effect = (
+        lambda name, embedding_function: collections[name]
+    )
+    embed = Mock(side_effect=lambda texts: [[0.0, 1.0] for _ in texts])
+
+    monkeypatch.setattr(chromadb, "PersistentClient", lambda path, settings: client)
+    monkeypatch.setattr(
+        embedding_functions,
+        "SentenceTransformerEmbeddingFunction",
+        lambda model_name: embed,
+    )
+    return SimpleNamespace(
+        vs=VectorStore("unused", "all-MiniLM-L6-v2", max_results=5),
+        client=client,
+        embed=embed,
+        catalog=collections["course_catalog"],
+        content=collections["course_content"],
+    )
+
+
 # === Mock Anthropic Client ===
+# Responses only carry attributes, so plain namespaces stand in for Mock()
 @pytest.fixture
 def mock_anthropic_response_no_tool():
     """Mock Anthropic response without tool use"""
-    mock_response = Mock()
-    mock_response.stop_reason = "end_turn"
-    mock_text_block = Mock()
-    mock_text_block.type = "text"
-    mock_text_block.text = "This is a direct response without tool use."
-    mock_response.content = [mock_text_block]
-    return mock_response
+    return SimpleNamespace(
+        stop_reason="end_turn",
+        content=[
+            SimpleNamespace(
+                type="text", text="This is a direct response without tool use."
+            )
+        ],
+    )
 
 
 @pytest.fixture
 def mock_anthropic_response_with_tool():
     """Mock Anthropic response with tool use request"""
-    mock_response = Mock()
-    mock_response.stop_reason = "tool_use"
-
-    # Create tool_use content block
-    tool_use_block = Mock()
-    tool_use_block.type = "tool_use"
-    tool_use_block.name = "search_course_content"
-    tool_use_block.id = "tool_123"
-    tool_use_block.input = {"query": "Python programming", "course_name": None}
-
-    mock_response.content = [tool_use_block]
-    return mock_response
+    tool_use_block = SimpleNamespace(
+        type="tool_use",
+        name="search_course_content",
+        id="tool_123",
+        input={"query": "Python programming", "course_name": None},
+    )
+    return SimpleNamespace(stop_reason="tool_use", content=[tool_use_block])
 
 
 @pytest.fixture
 def mock_anthropic_final_response():
     """Mock final Anthropic response after tool execution"""
-    mock_response = Mock()
-    mock_response.stop_reason = "end_turn"
-    mock_text_block = Mock()
-    mock_text_block.type = "text"
-    mock_text_block.text = (
-        "Based on the course materials, Python is a programming language."
+    return SimpleNamespace(
+        stop_reason="end_turn",
+        content=[
+            SimpleNamespace(
+                type="text",
+                text="Based on the course materials, Python is a programming language.",
+            )
+        ],
     )
-    mock_response.content = [mock_text_block]
-    return mock_response
+
+
+# Session fixtures are built once per xdist worker and only read afterwards
+@pytest.fixture(scope="session")
+def generator():
+    """One AIGenerator for the session; tests swap in mock_anthropic_client"""
+    from ai_generator import AIGenerator
+
+    return AIGenerator(api_key="test-key", model="claude-sonnet-4-20250514")
+
+
+@pytest.fixture(scope="session")
+def _anthropic_client():
+    """Client mock cached for the session"""
+    return Mock()
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_client_mock(_anthropic_client):
+    """Drop the shared client's recorded calls and canned results after each test"""
+    yield
+    # reset_mock recurses, so messages.create and messages.stream are cleared too
+    _anthropic_client.reset_mock(return_value=True, side_effect=True)
 
 
 @pytest.fixture
-def mock_anthropic_client(mock_anthropic_response_no_tool):
-    """Mock Anthropic client"""
-    mock_client = Mock()
-    mock_client.messages.create.return_value = mock_anthropic_response_no_tool
-    return mock_client
+def mock_anthropic_client(
+    generator, _anthropic_client, mock_anthropic_response_no_tool
+):
+    """Mock Anthropic client injected into the generator for each test"""
+    _anthropic_client.messages.create.return_value = mock_anthropic_response_no_tool
+    generator.client = _anthropic_client
+    return _anthropic_client
 
 
 # === Multi-Round Tool Calling Fixtures ===
 @pytest.fixture
 def mock_anthropic_response_second_tool_use():
     """Mock Anthropic response requesting a second tool after first result"""
-    mock_response = Mock()
-    mock_response.stop_reason = "tool_use"
+    tool_use_block = SimpleNamespace(
+        type="tool_use",
+        name="get_course_outline",
+        id="tool_456",
+        input={"course_title": "Introduction to Python"},
+    )
+    return SimpleNamespace(stop_reason="tool_use", content=[tool_use_block])
+
+
+@pytest.fixture(scope="session")
+def _multi_round_template():
+    """Responses for 2-round tool calling, built once per session"""
+    return [
+        create_tool_use_response(  # Round 1: first tool request
+            "search_course_content",
+            "tool_123",
+            {"query": "Python programming", "course_name": None},
+        ),
+        create_tool_use_response(  # Round 2: second tool request
+            "get_course_outline",
+            "tool_456",
+            {"course_title": "Introduction to Python"},
+        ),
+        create_text_response(  # Final: text response
+            "Based on the course materials, Python is a programming language."
+        ),
+    ]
+
 
-    tool_use_block = Mock()
-    tool_use_block.type = "tool_use"
-    tool_use_block.name = "get_course_outline"
-    tool_use_block.id = "tool_456"
-    tool_use_block.input = {"course_title": "Introduction to Python"}
+@pytest.fixture
+def mock_multi_round_response_sequence(_multi_round_template):
+    """Complete sequence for 2-round tool calling: tool1 -> tool2 -> final"""
+    # Shallow copy; the responses are only read, so they can be shared
+    return list(_multi_round_template)
 
-    mock_response.content = [tool_use_block]
-    return mock_response
+
+def _tool_scenario(client, responses, tool_result="Tool result"):
+    """Queue API responses on the client and pair it with a tool manager mock"""
+    client.messages.create.side_effect = responses
+    tool_manager = Mock()
+    tool_manager.execute_tool.return_value = tool_result
+    return client, tool_manager
 
 
 @pytest.fixture
-def mock_multi_round_response_sequence(
+def two_call_scenario(
+    mock_anthropic_client,
     mock_anthropic_response_with_tool,
-    mock_anthropic_response_second_tool_use,
     mock_anthropic_final_response,
 ):
-    """Complete sequence for 2-round tool calling: tool1 -> tool2 -> final"""
-    return [
-        mock_anthropic_response_with_tool,  # Round 1: first tool request
-        mock_anthropic_response_second_tool_use,  # Round 2: second tool request
-        mock_anthropic_final_response,  # Final: text response
-    ]
+    """One tool round then a final answer: (client, tool_manager)"""
+    return _tool_scenario(
+        mock_anthropic_client,
+        [mock_anthropic_response_with_tool, mock_anthropic_final_response],
+    )
 
 
-def create_tool_use_response(tool_name: str, tool_id: str, tool_input: dict):
-    """Factory function to create mock tool use responses"""
-    mock_response = Mock()
-    mock_response.stop_reason = "tool_use"
+@pytest.fixture
+def error_then_final_scenario(
+    mock_anthropic_client,
+    mock_anthropic_response_with_tool,
+    mock_anthropic_final_response,
+):
+    """A failing tool round then a final answer: (client, tool_manager)"""
+    return _tool_scenario(
+        mock_anthropic_client,
+        [mock_anthropic_response_with_tool, mock_anthropic_final_response],
+        tool_result="Error: Tool execution failed",
+    )
+
 
-    tool_use_block = Mock()
-    tool_use_block.type = "tool_use"
-    tool_use_block.name = tool_name
-    tool_use_block.id = tool_id
-    tool_use_block.input = tool_input
+@pytest.fixture
+def max_rounds_scenario(
+    mock_anthropic_client,
+    mock_anthropic_response_with_tool,
+    mock_anthropic_final_response,
+):
+    """Claude keeps requesting tools past MAX_TOOL_ROUNDS: (client, tool_manager)"""
+    return _tool_scenario(
+        mock_anthropic_client,
+        [
+            mock_anthropic_response_with_tool,  # Initial: tool 1
+            mock_anthropic_response_with_tool,  # Round 1: tool 2
+            mock_anthropic_response_with_tool,  # Round 2: tool 3 (forced to text)
+            mock_anthropic_final_response,  # Forced final response
+        ],
+    )
 
-    mock_response.content = [tool_use_block]
-    return mock_response
 
+@pytest.fixture
+def multi_round_scenario(mock_anthropic_client, mock_multi_round_response_sequence):
+    """Two sequential tool rounds then a final answer: (client, tool_manager)"""
+    return _tool_scenario(mock_anthropic_client, mock_multi_round_response_sequence)
 
-def create_text_response(text: str):
-    """Factory function to create mock text responses"""
-    mock_response = Mock()
-    mock_response.stop_reason = "end_turn"
 
-    text_block = Mock()
-    text_block.type = "text"
-    text_block.text = text
+def create_tool_use_response(tool_name: str, tool_id: str, tool_input: dict):
+    """Factory function to create mock tool use responses"""
+    tool_use_block = SimpleNamespace(
+        type="tool_use", name=tool_name, id=tool_id, input=tool_input
+    )
+    return SimpleNamespace(stop_reason="tool_use", content=[tool_use_block])
 
-    mock_response.content = [text_block]
-    return mock_response
+
+def create_text_response(text: str):
+    """Factory function to create mock text responses"""
+    text_block = SimpleNamespace(type="text", text=text)
+    return SimpleNamespace(stop_reason="end_turn", content=[text_block])
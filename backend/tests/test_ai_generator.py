@@ -9,451 +9,396 @@ These tests verify:
 """
 
 import pytest
-import sys
-import os
-from unittest.mock import Mock, patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import Mock
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from ai_generator import AIGenerator
+# Read-only; AIGenerator passes tools through without mutating them
+TOOLS = (
+    {"name": "search_course_content", "description": "Search", "input_schema": {}},
+)
+HISTORY = "User: Hi\nAssistant: Hello!"
 
 
 class TestAIGeneratorGenerateResponse:
     """Test AIGenerator.generate_response() method"""
 
-    def test_generate_response_without_tools(self, mock_anthropic_response_no_tool):
-        """Test direct response when no tools are provided"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.return_value = mock_anthropic_response_no_tool
-            MockAnthropic.return_value = mock_client
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            result = generator.generate_response(query="What is Python?")
-
-            assert result == "This is a direct response without tool use."
-            mock_client.messages.create.assert_called_once()
-
-    def test_generate_response_includes_tools_in_api_call(
-        self, mock_anthropic_response_no_tool
+    @pytest.mark.parametrize(
+        "kwargs,assertion",
+        [
+            pytest.param(
+                {"query": "What is Python?"},
+                lambda c: "tools" not in c.kwargs,
+                id="without_tools",
+            ),
+            pytest.param(
+                {"query": "Search for Python", "tools": TOOLS},
+                lambda c: "tools" in c.kwargs
+                and c.kwargs["tool_choice"] == {"type": "auto"},
+                id="includes_tools_in_api_call",
+            ),
+            pytest.param(
+                {"query": "What next?", "conversation_history": HISTORY},
+                lambda c: "Previous conversation" in c.kwargs["system"]
+                and HISTORY in c.kwargs["system"],
+                id="includes_conversation_history",
+            ),
+            pytest.param(
+                {"query": "What is Python?"},
+                lambda c: "Previous conversation" not in c.kwargs["system"],
+                id="without_history",
+            ),
+        ],
+    )
+    def test_generate_response(
+        self, generator, mock_anthropic_client, kwargs, assertion
     ):
-        """Test that tools are passed to API when provided"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.return_value = mock_anthropic_response_no_tool
-            MockAnthropic.return_value = mock_client
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            generator.generate_response(query="Search for Python", tools=tools)
-
-            call_args = mock_client.messages.create.call_args
-            assert "tools" in call_args.kwargs
-            assert call_args.kwargs["tool_choice"] == {"type": "auto"}
-
-    def test_generate_response_includes_conversation_history(
-        self, mock_anthropic_response_no_tool
-    ):
-        """Test that conversation history is included in system prompt"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.return_value = mock_anthropic_response_no_tool
-            MockAnthropic.return_value = mock_client
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            history = "User: Hi\nAssistant: Hello!"
-
-            generator.generate_response(
-                query="What next?", conversation_history=history
-            )
+        """Test a direct response and the API call built for each set of arguments"""
+        result = generator.generate_response(**kwargs)
 
-            call_args = mock_client.messages.create.call_args
-            assert "Previous conversation" in call_args.kwargs["system"]
-            assert history in call_args.kwargs["system"]
-
-    def test_generate_response_without_history(self, mock_anthropic_response_no_tool):
-        """Test that system prompt works without history"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.return_value = mock_anthropic_response_no_tool
-            MockAnthropic.return_value = mock_client
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-
-            generator.generate_response(query="What is Python?")
-
-            call_args = mock_client.messages.create.call_args
-            assert "Previous conversation" not in call_args.kwargs["system"]
+        assert result == "This is a direct response without tool use."
+        mock_anthropic_client.messages.create.assert_called_once()
+        assert assertion(mock_anthropic_client.messages.create.call_args)
 
 
 class TestAIGeneratorToolExecution:
     """Test AIGenerator._handle_tool_execution() method"""
 
-    def test_tool_execution_flow(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
-    ):
+    def test_tool_execution_flow(self, generator, two_call_scenario):
         """Test complete tool execution flow: request -> execute -> final response"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            # First call returns tool use, second call returns final response
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,
-            ]
-            MockAnthropic.return_value = mock_client
-
-            # Create mock tool manager
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = (
-                "Python is a programming language used for web development."
-            )
+        # First call returns tool use, second call returns final response
+        mock_client, mock_tool_manager = two_call_scenario
+        mock_tool_manager.execute_tool.return_value = (
+            "Python is a programming language used for web development."
+        )
 
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            result = generator.generate_response(
-                query="Tell me about Python",
-                tools=tools,
-                tool_manager=mock_tool_manager,
-            )
+        result = generator.generate_response(
+            query="Tell me about Python",
+            tools=TOOLS,
+            tool_manager=mock_tool_manager,
+        )
 
-            # Verify tool was executed
-            mock_tool_manager.execute_tool.assert_called_once()
+        # Verify tool was executed
+        mock_tool_manager.execute_tool.assert_called_once()
 
-            # Verify final response
-            assert "Python" in result
-            assert mock_client.messages.create.call_count == 2
+        # Verify final response
+        assert "Python" in result
+        assert mock_client.messages.create.call_count == 2
 
     def test_tool_execution_passes_correct_parameters(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
+        self, generator, two_call_scenario
     ):
         """Test that tool parameters are correctly extracted and passed"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
+        _, mock_tool_manager = two_call_scenario
 
-            generator.generate_response(
-                query="test", tools=[{}], tool_manager=mock_tool_manager
-            )
+        generator.generate_response(
+            query="test", tools=[{}], tool_manager=mock_tool_manager
+        )
 
-            # Check that tool was called with input from API response
-            call_args = mock_tool_manager.execute_tool.call_args
-            assert call_args[0][0] == "search_course_content"
-            # Verify kwargs include the input parameters
-            assert "query" in call_args[1]
+        # Check that tool was called with input from API response
+        call_args = mock_tool_manager.execute_tool.call_args
+        assert call_args[0][0] == "search_course_content"
+        # Verify kwargs include the input parameters
+        assert "query" in call_args[1]
 
     def test_tool_result_included_in_followup_message(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
+        self, generator, two_call_scenario
     ):
         """Test that tool result is sent back to Claude in correct format"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "This is the tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
+        mock_client, mock_tool_manager = two_call_scenario
+        mock_tool_manager.execute_tool.return_value = "This is the tool result"
 
-            generator.generate_response(
-                query="test", tools=[{}], tool_manager=mock_tool_manager
-            )
+        generator.generate_response(
+            query="test", tools=[{}], tool_manager=mock_tool_manager
+        )
 
-            # Check second API call includes tool result
-            second_call = mock_client.messages.create.call_args_list[1]
-            messages = second_call.kwargs["messages"]
+        # Check second API call includes tool result
+        second_call = mock_client.messages.create.call_args_list[1]
+        messages = second_call.kwargs["messages"]
 
-            # Should have: user message, assistant tool_use, user tool_result
-            assert len(messages) == 3
-            assert messages[0]["role"] == "user"
-            assert messages[1]["role"] == "assistant"
-            assert messages[2]["role"] == "user"
+        # Should have: user message, assistant tool_use, user tool_result
+        assert len(messages) == 3
+        assert messages[0]["role"] == "user"
+        assert messages[1]["role"] == "assistant"
+        assert messages[2]["role"] == "user"
 
-            # Tool result is in content
-            tool_result_content = messages[2]["content"]
-            assert any(item["type"] == "tool_result" for item in tool_result_content)
+        # Tool result is in content
+        tool_result_content = messages[2]["content"]
+        assert len(tool_result_content) == 1
+        assert tool_result_content[0]["type"] == "tool_result"
 
     def test_second_api_call_includes_tools_for_potential_followup(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
+        self, generator, two_call_scenario
     ):
         """Test that the second API call includes tools (allowing sequential tool calls)"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [{"name": "test"}]
+        mock_client, mock_tool_manager = two_call_scenario
 
-            generator.generate_response(
-                query="test", tools=tools, tool_manager=mock_tool_manager
-            )
+        tools = [{"name": "test"}]
+
+        generator.generate_response(
+            query="test", tools=tools, tool_manager=mock_tool_manager
+        )
 
-            # Check second API call DOES include tools (for potential sequential calls)
-            second_call = mock_client.messages.create.call_args_list[1]
-            assert "tools" in second_call.kwargs
-            assert second_call.kwargs["tools"] == tools
+        # Check second API call DOES include tools (for potential sequential calls)
+        second_call = mock_client.messages.create.call_args_list[1]
+        assert "tools" in second_call.kwargs
+        assert second_call.kwargs["tools"] == tools
 
 
 class TestAIGeneratorConfiguration:
     """Test AIGenerator configuration and initialization"""
 
-    def test_base_params_configured(self):
+    def test_base_params_configured(self, generator, mock_anthropic_client):
         """Test that base API parameters are set correctly"""
-        with patch("anthropic.Anthropic"):
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-
-            assert generator.base_params["model"] == "claude-sonnet-4-20250514"
-            assert generator.base_params["temperature"] == 0
-            assert generator.base_params["max_tokens"] == 800
+        assert generator.base_params["model"] == "claude-sonnet-4-20250514"
+        assert generator.base_params["temperature"] == 0
+        assert generator.base_params["max_tokens"] == 800
 
-    def test_system_prompt_defined(self):
+    def test_system_prompt_defined(self, generator, mock_anthropic_client):
         """Test that system prompt is defined and contains key instructions"""
-        with patch("anthropic.Anthropic"):
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-
-            assert "course materials" in generator.SYSTEM_PROMPT.lower()
-            assert "tool" in generator.SYSTEM_PROMPT.lower()
+        assert "course materials" in generator.SYSTEM_PROMPT.lower()
+        assert "tool" in generator.SYSTEM_PROMPT.lower()
 
-    def test_system_prompt_has_tool_instructions(self):
+    def test_system_prompt_has_tool_instructions(
+        self, generator, mock_anthropic_client
+    ):
         """Test that system prompt includes tool usage instructions"""
-        with patch("anthropic.Anthropic"):
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-
-            assert "search_course_content" in generator.SYSTEM_PROMPT
-            assert "get_course_outline" in generator.SYSTEM_PROMPT
+        assert "search_course_content" in generator.SYSTEM_PROMPT
+        assert "get_course_outline" in generator.SYSTEM_PROMPT
 
 
+@pytest.mark.slow
 class TestSequentialToolCalling:
     """Test sequential tool calling (up to 2 rounds per query)"""
 
-    def test_two_sequential_tool_calls(self, mock_multi_round_response_sequence):
+    def test_two_sequential_tool_calls(self, generator, multi_round_scenario):
         """Test that Claude can make 2 sequential tool calls before final response"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            # Sequence: tool_use -> tool_use -> text
-            mock_client.messages.create.side_effect = mock_multi_round_response_sequence
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            result = generator.generate_response(
-                query="Find courses related to lesson 4 of Python course",
-                tools=tools,
-                tool_manager=mock_tool_manager,
-            )
-
-            # Verify: 3 API calls (initial + 2 in loop)
-            assert mock_client.messages.create.call_count == 3
-            # Verify: 2 tool executions
-            assert mock_tool_manager.execute_tool.call_count == 2
-            # Verify: got final text response
-            assert "Python" in result
-
-    def test_single_tool_call_when_sufficient(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
-    ):
+        # Sequence: tool_use -> tool_use -> text
+        mock_client, mock_tool_manager = multi_round_scenario
+
+        result = generator.generate_response(
+            query="Find courses related to lesson 4 of Python course",
+            tools=TOOLS,
+            tool_manager=mock_tool_manager,
+        )
+
+        # Verify: 3 API calls (initial + 2 in loop)
+        assert mock_client.messages.create.call_count == 3
+        # Verify: 2 tool executions
+        assert mock_tool_manager.execute_tool.call_count == 2
+        # Verify: got final text response
+        assert "Python" in result
+
+    def test_single_tool_call_when_sufficient(self, generator, two_call_scenario):
         """Test backward compatibility: single tool call still works"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            # Sequence: tool_use -> text (no second tool needed)
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            result = generator.generate_response(
-                query="What is Python?", tools=tools, tool_manager=mock_tool_manager
-            )
+        # Sequence: tool_use -> text (no second tool needed)
+        mock_client, mock_tool_manager = two_call_scenario
 
-            # Verify: only 2 API calls (initial + 1 in loop)
-            assert mock_client.messages.create.call_count == 2
-            # Verify: only 1 tool execution
-            assert mock_tool_manager.execute_tool.call_count == 1
-            assert "Python" in result
+        result = generator.generate_response(
+            query="What is Python?", tools=TOOLS, tool_manager=mock_tool_manager
+        )
 
-    def test_max_rounds_enforced(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
-    ):
+        # Verify: only 2 API calls (initial + 1 in loop)
+        assert mock_client.messages.create.call_count == 2
+        # Verify: only 1 tool execution
+        assert mock_tool_manager.execute_tool.call_count == 1
+        assert "Python" in result
+
+    def test_max_rounds_enforced(self, generator, max_rounds_scenario):
         """Test that tool calling stops after MAX_TOOL_ROUNDS even if Claude wants more"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            # Claude keeps requesting tools indefinitely
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,  # Initial: tool 1
-                mock_anthropic_response_with_tool,  # Round 1: tool 2
-                mock_anthropic_response_with_tool,  # Round 2: tool 3 (should be forced to text)
-                mock_anthropic_final_response,  # Forced final response
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            result = generator.generate_response(
-                query="Complex query", tools=tools, tool_manager=mock_tool_manager
-            )
+        # Claude keeps requesting tools indefinitely
+        mock_client, mock_tool_manager = max_rounds_scenario
 
-            # Verify: 4 API calls (initial + 2 rounds + forced final)
-            assert mock_client.messages.create.call_count == 4
-            # Verify: only 2 tool executions (MAX_TOOL_ROUNDS)
-            assert mock_tool_manager.execute_tool.call_count == 2
-            assert "Python" in result
+        result = generator.generate_response(
+            query="Complex query", tools=TOOLS, tool_manager=mock_tool_manager
+        )
 
-    def test_tool_failure_terminates_loop(
-        self, mock_anthropic_response_with_tool, mock_anthropic_final_response
-    ):
+        # Verify: 4 API calls (initial + 2 rounds + forced final)
+        assert mock_client.messages.create.call_count == 4
+        # Verify: only 2 tool executions (MAX_TOOL_ROUNDS)
+        assert mock_tool_manager.execute_tool.call_count == 2
+        assert "Python" in result
+
+    def test_tool_failure_terminates_loop(self, generator, error_then_final_scenario):
         """Test that tool failure terminates the loop and gets graceful response"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = [
-                mock_anthropic_response_with_tool,
-                mock_anthropic_final_response,  # Response after tool error
-            ]
-            MockAnthropic.return_value = mock_client
-
-            mock_tool_manager = Mock()
-            # Tool returns error
-            mock_tool_manager.execute_tool.return_value = "Error: Tool execution failed"
-
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
-            )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            result = generator.generate_response(
-                query="Search something", tools=tools, tool_manager=mock_tool_manager
-            )
+        # Tool returns error, then Claude answers gracefully
+        mock_client, mock_tool_manager = error_then_final_scenario
+
+        result = generator.generate_response(
+            query="Search something", tools=TOOLS, tool_manager=mock_tool_manager
+        )
 
-            # Verify: only 2 API calls (initial + forced final after error)
-            assert mock_client.messages.create.call_count == 2
-            # Verify: only 1 tool execution (stopped after failure)
-            assert mock_tool_manager.execute_tool.call_count == 1
+        # Verify: only 2 API calls (initial + forced final after error)
+        assert mock_client.messages.create.call_count == 2
+        # Verify: only 1 tool execution (stopped after failure)
+        assert mock_tool_manager.execute_tool.call_count == 1
 
-    def test_tools_available_during_rounds(self, mock_multi_round_response_sequence):
+    def test_tools_available_during_rounds(self, generator, multi_round_scenario):
         """Test that tools are passed to API calls during tool rounds (not stripped)"""
-        with patch("anthropic.Anthropic") as MockAnthropic:
-            mock_client = Mock()
-            mock_client.messages.create.side_effect = mock_multi_round_response_sequence
-            MockAnthropic.return_value = mock_client
+        mock_client, mock_tool_manager = multi_round_scenario
+
+        generator.generate_response(
+            query="Complex query", tools=TOOLS, tool_manager=mock_tool_manager
+        )
+
+        # Check that second API call (first round in loop) includes tools
+        second_call = mock_client.messages.create.call_args_list[1]
+        assert "tools" in second_call.kwargs
+        assert second_call.kwargs["tools"] == TOOLS
+
+
+class FakeMessageStream:
+    """Stands in for the MessageStream context manager from messages.stream()"""
+
+    def __init__(self, final_response, deltas=()):
+        self.final_response = final_response
+        self.deltas = deltas
+        self.finished = False  # Set once every event has been consumed
 
-            mock_tool_manager = Mock()
-            mock_tool_manager.execute_tool.return_value = "Tool result"
+    def __enter__(self):
+        return self
 
-            generator = AIGenerator(
-                api_key="test-key", model="claude-sonnet-4-20250514"
+    def __exit__(self, *exc_info):
+        return False
+
+    def __iter__(self):
+        for text in self.deltas:
+            yield SimpleNamespace(type="text", text=text)
+        for block in self.final_response.content:
+            if block.type == "tool_use":
+                yield SimpleNamespace(type="content_block_start", content_block=block)
+        yield SimpleNamespace(type="message_stop")
+        self.finished = True
+
+    def get_final_message(self):
+        return self.final_response
+
+
+def make_stream(final_response, deltas=()):
+    """Fake the stream returned by client.messages.stream()"""
+    return FakeMessageStream(final_response, deltas)
+
+
+class TestAIGeneratorStreaming:
+    """Test AIGenerator.generate_response_stream()"""
+
+    def test_stream_yields_text_deltas(
+        self, generator, mock_anthropic_client, mock_anthropic_response_no_tool
+    ):
+        """Test that text deltas are yielded as they arrive"""
+        mock_anthropic_client.messages.stream.return_value = make_stream(
+            mock_anthropic_response_no_tool, ["Python ", "is ", "great."]
+        )
+
+        deltas = list(generator.generate_response_stream(query="What is Python?"))
+
+        assert deltas == ["Python ", "is ", "great."]
+        mock_anthropic_client.messages.create.assert_not_called()
+
+    def test_stream_runs_tools_before_streaming_answer(
+        self,
+        generator,
+        mock_anthropic_client,
+        mock_anthropic_response_with_tool,
+        mock_anthropic_final_response,
+    ):
+        """Test that a tool round executes and the follow-up answer is streamed"""
+        mock_anthropic_client.messages.stream.side_effect = [
+            make_stream(mock_anthropic_response_with_tool),
+            make_stream(mock_anthropic_final_response, ["Python ", "answer"]),
+        ]
+
+        mock_tool_manager = Mock()
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+
+        tools = [{"name": "search_course_content", "input_schema": {}}]
+
+        deltas = list(
+            generator.generate_response_stream(
+                query="What is Python?",
+                tools=tools,
+                tool_manager=mock_tool_manager,
             )
-            tools = [
-                {
-                    "name": "search_course_content",
-                    "description": "Search",
-                    "input_schema": {},
-                }
-            ]
-
-            generator.generate_response(
-                query="Complex query", tools=tools, tool_manager=mock_tool_manager
+        )
+
+        assert deltas == ["Python ", "answer"]
+        mock_tool_manager.execute_tool.assert_called_once_with(
+            "search_course_content",
+            query="Python programming",
+            course_name=None,
+        )
+        follow_up = mock_anthropic_client.messages.stream.call_args_list[1].kwargs
+        assert follow_up["messages"][-1]["content"][0]["content"] == "Tool result"
+
+    def test_stream_drops_text_from_tool_rounds(
+        self,
+        generator,
+        mock_anthropic_client,
+        mock_anthropic_response_with_tool,
+        mock_anthropic_response_second_tool_use,
+        mock_anthropic_final_response,
+    ):
+        """Test that preambles before tool calls are dropped over several rounds"""
+        mock_anthropic_client.messages.stream.side_effect = [
+            make_stream(mock_anthropic_response_with_tool, ["Let me search."]),
+            make_stream(mock_anthropic_response_second_tool_use, ["One more."]),
+            make_stream(mock_anthropic_final_response, ["Python ", "answer"]),
+        ]
+        mock_tool_manager = Mock()
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+
+        deltas = list(
+            generator.generate_response_stream(
+                query="What is Python?", tools=TOOLS, tool_manager=mock_tool_manager
             )
+        )
+
+        assert deltas == ["Python ", "answer"]
+        assert mock_tool_manager.execute_tool.call_count == 2
+        assert mock_anthropic_client.messages.stream.call_count == 3
+
+    def test_stream_forced_final_answer_after_max_rounds(
+        self,
+        generator,
+        mock_anthropic_client,
+        mock_anthropic_response_with_tool,
+        mock_anthropic_final_response,
+    ):
+        """Test that the tool-free final call is streamed once rounds run out"""
+        mock_anthropic_client.messages.stream.side_effect = [
+            make_stream(mock_anthropic_response_with_tool, ["Searching."]),
+            make_stream(mock_anthropic_response_with_tool, ["Searching again."]),
+            make_stream(mock_anthropic_response_with_tool, ["And again."]),
+            make_stream(mock_anthropic_final_response, ["Final ", "answer"]),
+        ]
+        mock_tool_manager = Mock()
+        mock_tool_manager.execute_tool.return_value = "Tool result"
+
+        deltas = list(
+            generator.generate_response_stream(
+                query="What is Python?", tools=TOOLS, tool_manager=mock_tool_manager
+            )
+        )
 
-            # Check that second API call (first round in loop) includes tools
-            second_call = mock_client.messages.create.call_args_list[1]
-            assert "tools" in second_call.kwargs
-            assert second_call.kwargs["tools"] == tools
+        assert deltas == ["Final ", "answer"]
+        assert mock_tool_manager.execute_tool.call_count == 2
+        final_call = mock_anthropic_client.messages.stream.call_args_list[3].kwargs
+        assert "tools" not in final_call
+
+    def test_stream_with_tools_yields_before_message_finishes(
+        self, generator, mock_anthropic_client, mock_anthropic_final_response
+    ):
+        """Test that a tools-enabled answer streams once its first paragraph ends"""
+        stream = make_stream(
+            mock_anthropic_final_response,
+            ["Python is ", "a language.\n", "\nIt is ", "popular."],
+        )
+        mock_anthropic_client.messages.stream.return_value = stream
+
+        deltas = generator.generate_response_stream(
+            query="What is Python?", tools=TOOLS, tool_manager=Mock()
+        )
+
+        assert next(deltas) == "Python is "
+        assert not stream.finished
+        assert list(deltas) == ["a language.\n", "\nIt is ", "popular."]
+        assert stream.finished
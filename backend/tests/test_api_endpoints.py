@@ -1,95 +1,107 @@
 """
 API endpoint tests for the RAG chatbot.
 
-These tests define the API inline to avoid static file mounting issues
-that occur when importing the main app.py.
+These tests mount the production router from api.py on a bare app, avoiding
+the RAGSystem construction and static file mounting done by app.py.
 """
+
+import os
+import re
+import orjson
 import pytest
-from unittest.mock import Mock, patch
-from fastapi import FastAPI, HTTPException
+from dataclasses import replace
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response
 from fastapi.testclient import TestClient
-from pydantic import BaseModel
-from typing import List, Optional
+from pathlib import Path
 
+from api import create_router, drop_none_fields
 
-# === Test App Definition ===
-# Define endpoints inline to avoid static file mounting issues from app.py
+# The health check never changes, so serialize it once
+ROOT_RESPONSE_BYTES = orjson.dumps({"status": "ok", "message": "RAG System API"})
+
+# Set PROFILE_TESTS=1 to write a speedscope profile of each test's requests here
+PROFILE_DIR = Path(__file__).resolve().parents[2] / ".profiles"
+
+
+def add_profiling_middleware(app):
+    """Profile every request with pyinstrument, one speedscope file per test"""
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    PROFILE_DIR.mkdir(exist_ok=True)
+
+    @app.middleware("http")
+    async def profile_request(request, call_next):
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        response = await call_next(request)
+        profiler.stop()
+        # e.g. "backend/tests/test_api_endpoints.py::TestX::test_y (call)"
+        test_id = os.environ.get("PYTEST_CURRENT_TEST", "request").split(" ")[0]
+        name = re.sub(r"[^\w.-]+", "_", test_id)
+        (PROFILE_DIR / f"{name}.speedscope.json").write_text(
+            profiler.output(renderer=SpeedscopeRenderer())
+        )
+        return response
 
+
+# === Test App Definition ===
 def create_test_app(mock_rag_system):
-    """Factory to create a test FastAPI app with mocked RAGSystem"""
-
-    test_app = FastAPI(title="Test Course Materials RAG System")
-
-    # Store mock in app state for access in endpoints
-    test_app.state.rag_system = mock_rag_system
-
-    # Pydantic models (same as production)
-    class QueryRequest(BaseModel):
-        query: str
-        session_id: Optional[str] = None
-
-    class QueryResponse(BaseModel):
-        answer: str
-        sources: List[dict]
-        session_id: str
-
-    class CourseStats(BaseModel):
-        total_courses: int
-        course_titles: List[str]
-
-    @test_app.post("/api/query", response_model=QueryResponse)
-    async def query_documents(request: QueryRequest):
-        """Process a query and return response with sources"""
-        try:
-            rag = test_app.state.rag_system
-            session_id = request.session_id
-            if not session_id:
-                session_id = rag.session_manager.create_session()
-
-            answer, sources = rag.query(request.query, session_id)
-
-            return QueryResponse(
-                answer=answer,
-                sources=sources,
-                session_id=session_id
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-
-    @test_app.get("/api/courses", response_model=CourseStats)
-    async def get_course_stats():
-        """Get course analytics and statistics"""
-        try:
-            rag = test_app.state.rag_system
-            analytics = rag.get_course_analytics()
-            return CourseStats(
-                total_courses=analytics["total_courses"],
-                course_titles=analytics["course_titles"]
-            )
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    """Factory to create a test FastAPI app with stubbed RAGSystem"""
+
+    test_app = FastAPI(
+        title="Test Course Materials RAG System", default_response_class=ORJSONResponse
+    )
+
+    if os.environ.get("PROFILE_TESTS") == "1":
+        add_profiling_middleware(test_app)
+
+    test_app.include_router(create_router(mock_rag_system))
 
     @test_app.get("/")
     async def root():
         """Health check endpoint"""
-        return {"status": "ok", "message": "RAG System API"}
+        return Response(content=ROOT_RESPONSE_BYTES, media_type="application/json")
 
     return test_app
 
 
 # === Test Fixtures ===
-@pytest.fixture
-def test_client(mock_rag_system):
-    """Create test client with mocked RAGSystem"""
-    app = create_test_app(mock_rag_system)
-    return TestClient(app)
+@pytest.fixture(scope="module")
+def test_app(mock_rag_system):
+    """Create test app with stubbed RAGSystem, shared by the module"""
+    return create_test_app(mock_rag_system)
+
+
+@pytest.fixture(scope="module")
+def test_client(test_app):
+    """Create test client for the shared test app, kept open for the module"""
+    # Entered once so every request reuses one event loop portal; unentered,
+    # TestClient starts a new portal thread per request
+    with TestClient(test_app) as client:
+        yield client
 
 
-@pytest.fixture
+def _json(response):
+    """Decode a TestClient response body with orjson"""
+    return orjson.loads(response.content)
+
+
+@pytest.fixture(scope="module")
 def test_client_error(mock_rag_system_error):
-    """Create test client with error-throwing RAGSystem"""
+    """Create test client with error-raising RAGSystem, shared by the module"""
     app = create_test_app(mock_rag_system_error)
-    return TestClient(app)
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def _reset_rag_system_mocks(mock_rag_system, mock_rag_system_error):
+    """Clear recorded calls on the shared stubs after each test"""
+    yield
+    mock_rag_system.calls.clear()
+    mock_rag_system_error.calls.clear()
 
 
 # === Query Endpoint Tests ===
@@ -98,13 +110,10 @@ class TestQueryEndpoint:
 
     def test_query_with_valid_request(self, test_client, mock_rag_system):
         """Test successful query returns answer and sources"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": "What is Python?"}
-        )
+        response = test_client.post("/api/query", json={"query": "What is Python?"})
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert "answer" in data
         assert "sources" in data
         assert "session_id" in data
@@ -116,40 +125,38 @@ class TestQueryEndpoint:
         """Test query with existing session ID"""
         response = test_client.post(
             "/api/query",
-            json={"query": "Tell me more", "session_id": "existing-session-456"}
+            json={"query": "Tell me more", "session_id": "existing-session-456"},
         )
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert data["session_id"] == "existing-session-456"
-        # Verify mock was called with correct session ID
-        mock_rag_system.query.assert_called_with("Tell me more", "existing-session-456")
-
-    def test_query_creates_new_session_when_not_provided(self, test_client, mock_rag_system):
+        # Verify the stub was called with correct session ID
+        assert mock_rag_system.calls == [
+            ("query", "Tell me more", "existing-session-456")
+        ]
+
+    def test_query_creates_new_session_when_not_provided(
+        self, test_client, mock_rag_system
+    ):
         """Test that a new session is created when session_id is not provided"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": "First question"}
-        )
+        response = test_client.post("/api/query", json={"query": "First question"})
 
         assert response.status_code == 200
-        mock_rag_system.session_manager.create_session.assert_called_once()
+        assert mock_rag_system.calls == [
+            ("create_session",),
+            ("query", "First question", "test-session-123"),
+        ]
 
     def test_query_with_empty_query(self, test_client):
         """Test that empty query string is handled"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": ""}
-        )
+        response = test_client.post("/api/query", json={"query": ""})
         # FastAPI/Pydantic allows empty strings by default
         assert response.status_code == 200
 
     def test_query_missing_query_field(self, test_client):
         """Test that missing query field returns 422"""
-        response = test_client.post(
-            "/api/query",
-            json={}
-        )
+        response = test_client.post("/api/query", json={})
 
         assert response.status_code == 422  # Unprocessable Entity
 
@@ -158,7 +165,7 @@ class TestQueryEndpoint:
         response = test_client.post(
             "/api/query",
             content="not json",
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
         )
 
         assert response.status_code == 422
@@ -166,12 +173,62 @@ class TestQueryEndpoint:
     def test_query_internal_error(self, test_client_error):
         """Test that RAGSystem errors return 500"""
         response = test_client_error.post(
-            "/api/query",
-            json={"query": "What is Python?"}
+            "/api/query", json={"query": "What is Python?"}
         )
 
         assert response.status_code == 500
-        assert "Database connection failed" in response.json()["detail"]
+        assert "Database connection failed" in _json(response)["detail"]
+
+
+# === Streaming Query Endpoint Tests ===
+class TestQueryStreamEndpoint:
+    """Tests for POST /api/query/stream endpoint"""
+
+    def test_stream_emits_text_then_done(self, mock_rag_system):
+        """Test that text events are followed by a done event with sources"""
+        sources = [{"text": "Introduction to Python - Lesson 1", "link": None}]
+        rag = replace(
+            mock_rag_system,
+            stream_chunks=(("Python is ", None), ("versatile.", None), ("", sources)),
+        )
+
+        response = TestClient(create_test_app(rag)).post(
+            "/api/query/stream",
+            json={"query": "What is Python?", "session_id": "session-1"},
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            orjson.loads(line[len("data: ") :])
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+        assert events == [
+            {"type": "text", "text": "Python is "},
+            {"type": "text", "text": "versatile."},
+            {
+                "type": "done",
+                "sources": [{"text": "Introduction to Python - Lesson 1"}],
+                "session_id": "session-1",
+            },
+        ]
+        assert rag.calls == [("query_stream", "What is Python?", "session-1")]
+
+    def test_stream_reports_errors_as_event(self, mock_rag_system):
+        """Test that a failure mid-stream is sent as an error event"""
+        rag = replace(mock_rag_system, query_error=Exception("API unavailable"))
+
+        response = TestClient(create_test_app(rag)).post(
+            "/api/query/stream", json={"query": "What is Python?"}
+        )
+
+        assert response.status_code == 200
+        assert response.text.startswith("data: ")
+        assert orjson.loads(response.text[len("data: ") :]) == {
+            "type": "error",
+            "detail": "API unavailable",
+        }
 
 
 # === Courses Endpoint Tests ===
@@ -183,7 +240,7 @@ class TestCoursesEndpoint:
         response = test_client.get("/api/courses")
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert data["total_courses"] == 3
         assert len(data["course_titles"]) == 3
         assert "Introduction to Python" in data["course_titles"]
@@ -193,7 +250,7 @@ class TestCoursesEndpoint:
         response = test_client_error.get("/api/courses")
 
         assert response.status_code == 500
-        assert "Analytics unavailable" in response.json()["detail"]
+        assert "Analytics unavailable" in _json(response)["detail"]
 
 
 # === Root Endpoint Tests ===
@@ -205,7 +262,7 @@ class TestRootEndpoint:
         response = test_client.get("/")
 
         assert response.status_code == 200
-        data = response.json()
+        data = _json(response)
         assert data["status"] == "ok"
 
 
@@ -215,33 +272,45 @@ class TestResponseFormats:
 
     def test_query_response_structure(self, test_client):
         """Test query response has correct structure"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": "Test query"}
-        )
+        data = _json(test_client.post("/api/query", json={"query": "Test query"}))
 
-        data = response.json()
         assert isinstance(data["answer"], str)
         assert isinstance(data["sources"], list)
         assert isinstance(data["session_id"], str)
 
     def test_sources_contain_required_fields(self, test_client):
         """Test source objects have text and link fields"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": "Test query"}
-        )
+        data = _json(test_client.post("/api/query", json={"query": "Test query"}))
 
-        data = response.json()
         for source in data["sources"]:
             assert "text" in source
             assert "link" in source
 
+    def test_sources_omit_missing_links(self, mock_rag_system):
+        """Test that a None link is left out of the source instead of sent as null"""
+        rag = replace(
+            mock_rag_system,
+            sources=({"text": "Python 101", "link": None, "score": 80},),
+        )
+
+        with TestClient(create_test_app(rag)) as client:
+            data = _json(client.post("/api/query", json={"query": "Test query"}))
+
+        assert data["sources"] == [{"text": "Python 101", "score": 80}]
+
+    def test_drop_none_fields_keeps_falsy_values(self):
+        """Test that only None is dropped, not other falsy values"""
+        sources = [{"text": "", "link": None, "score": 0}, {"text": "a", "link": "x"}]
+
+        assert drop_none_fields(sources) == [
+            {"text": "", "score": 0},
+            {"text": "a", "link": "x"},
+        ]
+
     def test_courses_response_structure(self, test_client):
         """Test courses response has correct structure"""
-        response = test_client.get("/api/courses")
+        data = _json(test_client.get("/api/courses"))
 
-        data = response.json()
         assert isinstance(data["total_courses"], int)
         assert isinstance(data["course_titles"], list)
 
@@ -255,16 +324,13 @@ class TestContentTypes:
         response = test_client.post(
             "/api/query",
             json={"query": "Test"},
-            headers={"Content-Type": "application/json"}
+            headers={"Content-Type": "application/json"},
         )
         assert response.status_code == 200
 
     def test_query_returns_json(self, test_client):
         """Test query endpoint returns application/json"""
-        response = test_client.post(
-            "/api/query",
-            json={"query": "Test"}
-        )
+        response = test_client.post("/api/query", json={"query": "Test"})
         assert response.headers["content-type"] == "application/json"
 
     def test_courses_returns_json(self, test_client):
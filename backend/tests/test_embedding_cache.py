@@ -0,0 +1,69 @@
+"""
+Tests for EmbeddingCache in embedding_cache.py
+
+These tests verify:
+1. Only uncached texts are sent to the encoder
+2. Embeddings persist across instances
+3. Entries are keyed by model
+"""
+
+import numpy as np
+import pytest
+from unittest.mock import Mock
+
+from embedding_cache import EmbeddingCache, dequantize, quantize
+
+
+def fake_encode(texts):
+    return [[float(len(text)), 1.0, 0.5] for text in texts]
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "embeddings.db")
+
+
+class TestEmbeddingCache:
+    """Test cache hits, misses and persistence"""
+
+    def test_encoder_called_only_for_misses(self, cache_path):
+        cache = EmbeddingCache(cache_path, "model-a")
+        encode = Mock(side_effect=fake_encode)
+
+        cache.embed(["alpha", "beta"], encode)
+        vectors = cache.embed(["beta", "gamma", "alpha"], encode)
+
+        assert encode.call_count == 2
+        assert encode.call_args[0][0] == ["gamma"]
+        expected = fake_encode(["beta", "gamma", "alpha"])
+        assert np.allclose(vectors, expected, atol=0.05)
+
+    def test_embeddings_persist_across_instances(self, cache_path):
+        EmbeddingCache(cache_path, "model-a").embed(["alpha"], fake_encode)
+
+        reopened = EmbeddingCache(cache_path, "model-a")
+        encode = Mock(side_effect=fake_encode)
+        vectors = reopened.embed(["alpha"], encode)
+
+        encode.assert_not_called()
+        assert np.allclose(vectors[0], fake_encode(["alpha"])[0], atol=0.05)
+
+    def test_entries_are_keyed_by_model(self, cache_path):
+        EmbeddingCache(cache_path, "model-a").embed(["alpha"], fake_encode)
+
+        assert EmbeddingCache(cache_path, "model-b").get_many(["alpha"]) == [None]
+
+
+class TestQuantization:
+    """Test the int8 on-disk encoding"""
+
+    def test_round_trip_preserves_direction(self):
+        vec = np.random.default_rng(0).standard_normal(384).astype(np.float32)
+
+        restored = dequantize(*quantize(vec))
+
+        cosine = vec @ restored / (np.linalg.norm(vec) * np.linalg.norm(restored))
+        assert cosine > 0.999
+
+    def test_zero_vector(self):
+        assert not dequantize(*quantize([0.0, 0.0])).any()
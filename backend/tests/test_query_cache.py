@@ -0,0 +1,162 @@
+"""
+Tests for SemanticQueryCache in query_cache.py
+
+These tests verify:
+1. Near-duplicate queries hit the cache
+2. Dissimilar queries miss
+3. Sessions are isolated from each other
+4. TTL expiry and LRU eviction
+"""
+
+import numpy as np
+import pytest
+from concurrent.futures import ThreadPoolExecutor, wait
+from unittest.mock import patch
+
+from query_cache import SemanticQueryCache
+
+# Fixed 3-d "embeddings" so similarity is predictable
+VECTORS = {
+    "What is Python?": [1.0, 0.0, 0.0],
+    "what is python": [0.99, 0.05, 0.0],
+    "Explain MCP servers": [0.0, 1.0, 0.0],
+    "How do vectors work?": [0.0, 0.0, 1.0],
+}
+
+
+def fake_embed(texts):
+    return [VECTORS[text] for text in texts]
+
+
+@pytest.fixture
+def cache():
+    return SemanticQueryCache(fake_embed, threshold=0.95, ttl=300, max_entries=2)
+
+
+class TestSemanticQueryCacheLookup:
+    """Test hit/miss behavior"""
+
+    def test_embed_query_is_normalized(self, cache):
+        q = cache.embed_query("what is python")
+        assert abs(float((q * q).sum()) - 1.0) < 1e-6
+
+    def test_zero_embedding_never_hits(self, cache):
+        cache.embed = lambda texts: [[0.0, 0.0, 0.0] for _ in texts]
+        q = cache.embed_query("empty")
+        cache.add("s1", q, "Answer", [])
+
+        assert not np.isnan(q).any()
+        assert cache.lookup("s1", q) is None
+
+    def test_near_duplicate_hits(self, cache):
+        sources = [{"text": "Python 101", "link": None}]
+        cache.add("s1", cache.embed_query("What is Python?"), "Answer", sources)
+
+        hit = cache.lookup("s1", cache.embed_query("what is python"))
+
+        assert hit == ("Answer", sources)
+
+    def test_dissimilar_query_misses(self, cache):
+        cache.add("s1", cache.embed_query("What is Python?"), "Answer", [])
+
+        assert cache.lookup("s1", cache.embed_query("Explain MCP servers")) is None
+
+    def test_sessions_are_isolated(self, cache):
+        cache.add("s1", cache.embed_query("What is Python?"), "Answer", [])
+
+        assert cache.lookup("s2", cache.embed_query("What is Python?")) is None
+
+
+class TestSemanticQueryCacheEviction:
+    """Test TTL expiry and LRU eviction"""
+
+    def test_expired_entries_miss(self, cache):
+        with patch("query_cache.time.monotonic", return_value=0.0):
+            cache.add("s1", cache.embed_query("What is Python?"), "Answer", [])
+
+        with patch("query_cache.time.monotonic", return_value=301.0):
+            assert cache.lookup("s1", cache.embed_query("What is Python?")) is None
+
+    def test_least_recently_used_evicted_at_capacity(self, cache):
+        clock = iter(range(100))
+        with patch("query_cache.time.monotonic", side_effect=lambda: next(clock)):
+            cache.add("s1", cache.embed_query("What is Python?"), "Python", [])
+            cache.add("s1", cache.embed_query("Explain MCP servers"), "MCP", [])
+            # Touch the Python entry so MCP becomes least recently used
+            cache.lookup("s1", cache.embed_query("What is Python?"))
+            cache.add("s1", cache.embed_query("How do vectors work?"), "Vectors", [])
+
+            python = cache.lookup("s1", cache.embed_query("What is Python?"))
+            mcp = cache.lookup("s1", cache.embed_query("Explain MCP servers"))
+            vectors = cache.lookup("s1", cache.embed_query("How do vectors work?"))
+
+        assert python[0] == "Python"
+        assert mcp is None
+        assert vectors[0] == "Vectors"
+
+    def test_expiring_several_entries_keeps_the_rest_aligned(self):
+        cache = SemanticQueryCache(fake_embed, threshold=0.95, ttl=300, max_entries=3)
+        with patch("query_cache.time.monotonic", return_value=0.0):
+            cache.add("s1", cache.embed_query("What is Python?"), "Python", [])
+            cache.add("s1", cache.embed_query("Explain MCP servers"), "MCP", [])
+        with patch("query_cache.time.monotonic", return_value=200.0):
+            cache.add("s1", cache.embed_query("How do vectors work?"), "Vectors", [])
+
+        with patch("query_cache.time.monotonic", return_value=320.0):
+            vectors = cache.lookup("s1", cache.embed_query("How do vectors work?"))
+            python = cache.lookup("s1", cache.embed_query("What is Python?"))
+
+        assert vectors[0] == "Vectors"
+        assert python is None
+        assert cache.namespaces["s1"].n == 1
+
+    def test_expired_session_is_dropped_on_lookup(self, cache):
+        with patch("query_cache.time.monotonic", return_value=0.0):
+            cache.add("s1", cache.embed_query("What is Python?"), "Answer", [])
+
+        with patch("query_cache.time.monotonic", return_value=301.0):
+            cache.lookup("s1", cache.embed_query("What is Python?"))
+
+        assert "s1" not in cache.namespaces
+
+    def test_new_session_drops_expired_sessions(self, cache):
+        with patch("query_cache.time.monotonic", return_value=0.0):
+            cache.add("s1", cache.embed_query("What is Python?"), "Answer", [])
+        with patch("query_cache.time.monotonic", return_value=200.0):
+            cache.add("s2", cache.embed_query("What is Python?"), "Answer", [])
+
+        with patch("query_cache.time.monotonic", return_value=301.0):
+            cache.add("s3", cache.embed_query("What is Python?"), "Answer", [])
+
+        assert set(cache.namespaces) == {"s2", "s3"}
+
+    def test_namespace_grows_past_initial_rows(self):
+        cache = SemanticQueryCache(fake_embed, threshold=0.95, ttl=300, max_entries=20)
+        q = cache.embed_query("What is Python?")
+        for i in range(20):
+            cache.add("s1", q, f"Answer {i}", [])
+
+        namespace = cache.namespaces["s1"]
+        assert namespace.n == 20
+        assert len(namespace.M) == 20
+
+
+class TestSemanticQueryCacheConcurrency:
+    """Test that request threads can share one cache"""
+
+    def test_add_and_lookup_wait_for_the_lock(self, cache):
+        q = cache.embed_query("What is Python?")
+        cache.add("s1", q, "Answer", [])
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            with cache._lock:
+                added = pool.submit(cache.add, "s2", q, "Other", [])
+                hit = pool.submit(cache.lookup, "s1", q)
+                # Neither can touch the namespaces while another thread holds them
+                assert not wait([added, hit], timeout=0.05).done
+                assert set(cache.namespaces) == {"s1"}
+
+            assert hit.result(timeout=5) == ("Answer", [])
+            added.result(timeout=5)
+
+        assert set(cache.namespaces) == {"s1", "s2"}
@@ -9,158 +9,239 @@ These tests verify:
 """
 
 import pytest
-import sys
-import os
-from unittest.mock import Mock, patch, MagicMock
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
+from dataclasses import replace
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import rag_system
+from rag_system import RAGSystem
+
+# rag_system attribute -> field of the _patch_rag_deps namespace
+RAG_DEPS = {
+    "VectorStore": "vs",
+    "AIGenerator": "ai",
+    "DocumentProcessor": "dp",
+    "SessionManager": "sm",
+}
+
+
+@pytest.fixture(scope="class")
+def _patch_rag_deps():
+    """Swap RAGSystem's collaborators for mocks once per test class"""
+    deps = SimpleNamespace(vs=Mock(), ai=Mock(), dp=Mock(), sm=Mock())
+    # Plain attribute swaps; patch() would redo target lookup for every entry
+    originals = {name: getattr(rag_system, name) for name in RAG_DEPS}
+    for name, attr in RAG_DEPS.items():
+        setattr(rag_system, name, getattr(deps, attr))
+    try:
+        yield deps
+    finally:
+        for name, original in originals.items():
+            setattr(rag_system, name, original)
+
+
+@pytest.fixture
+def rag_deps(_patch_rag_deps):
+    """The class-level patches, reset before each test"""
+    for mock_class in vars(_patch_rag_deps).values():
+        mock_class.reset_mock(return_value=True, side_effect=True)
+    # Plain Mocks aren't iterable, so give the default store an empty catalog
+    _patch_rag_deps.vs.return_value.get_all_courses_metadata.return_value = []
+    return _patch_rag_deps
+
+
+def stub_ai_generator(response):
+    """AIGenerator double for tests that only need a canned answer"""
+    return SimpleNamespace(generate_response=lambda **kwargs: response)
+
+
+def stub_vector_store(courses, lesson_links=None, catalog_version=0):
+    """VectorStore double for tests that only need canned link metadata"""
+    return SimpleNamespace(
+        catalog_version=catalog_version,
+        get_all_courses_metadata=lambda: courses,
+        get_lesson_links_bulk=lambda course_title, lessons: lesson_links or {},
+    )
 
 
 class TestRAGSystemQuery:
     """Test RAGSystem.query() method - the main entry point"""
 
-    def test_query_returns_response_and_sources(self, mock_config):
+    def test_query_returns_response_and_sources(self, rag_deps, mock_config):
         """Test that query() returns a tuple of (response, sources)"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            # Setup mocks
-            mock_vs_instance = Mock()
-            mock_vs_instance.get_all_courses_metadata.return_value = (
-                []
-            )  # Return empty list for link replacement
-            MockVectorStore.return_value = mock_vs_instance
+        # Setup mocks; an empty catalog means no course links to add
+        MockVectorStore.return_value = stub_vector_store([])
 
-            mock_ai_instance = Mock()
-            mock_ai_instance.generate_response.return_value = "Python is great!"
-            MockAIGenerator.return_value = mock_ai_instance
+        MockAIGenerator.return_value = stub_ai_generator("Python is great!")
 
-            from rag_system import RAGSystem
+        rag = RAGSystem(mock_config)
 
-            rag = RAGSystem(mock_config)
-
-            response, sources = rag.query("What is Python?")
+        response, sources = rag.query("What is Python?")
 
-            assert isinstance(response, str)
-            assert isinstance(sources, list)
+        assert isinstance(response, str)
+        assert isinstance(sources, list)
 
-    def test_query_uses_session_history(self, mock_config):
+    def test_query_uses_session_history(self, rag_deps, mock_config):
         """Test that query() retrieves and uses session history"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager") as MockSessionManager,
-        ):
-
-            mock_session = Mock()
-            mock_session.get_conversation_history.return_value = (
-                "Previous conversation..."
-            )
-            MockSessionManager.return_value = mock_session
+        MockAIGenerator = rag_deps.ai
+        MockSessionManager = rag_deps.sm
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "Response"
-            MockAIGenerator.return_value = mock_ai
+        # Only get_conversation_history is asserted on, so only it is a Mock
+        mock_session = SimpleNamespace(
+            get_conversation_history=Mock(return_value="Previous conversation..."),
+            add_exchange=lambda session_id, query, response: None,
+        )
+        MockSessionManager.return_value = mock_session
 
-            from rag_system import RAGSystem
+        mock_ai = Mock()
+        mock_ai.generate_response.return_value = "Response"
+        MockAIGenerator.return_value = mock_ai
 
-            rag = RAGSystem(mock_config)
+        rag = RAGSystem(mock_config)
 
-            rag.query("Follow up question", session_id="session_1")
+        rag.query("Follow up question", session_id="session_1")
 
-            mock_session.get_conversation_history.assert_called_with("session_1")
-            # Verify history was passed to AI
-            call_args = mock_ai.generate_response.call_args
-            assert (
-                call_args.kwargs.get("conversation_history")
-                == "Previous conversation..."
-            )
+        mock_session.get_conversation_history.assert_called_with("session_1")
+        # Verify history was passed to AI
+        call_args = mock_ai.generate_response.call_args
+        assert (
+            call_args.kwargs.get("conversation_history") == "Previous conversation..."
+        )
 
-    def test_query_updates_session_after_response(self, mock_config):
+    def test_query_updates_session_after_response(self, rag_deps, mock_config):
         """Test that query() adds exchange to session history"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager") as MockSessionManager,
-        ):
-
-            mock_session = Mock()
-            MockSessionManager.return_value = mock_session
+        MockAIGenerator = rag_deps.ai
+        MockSessionManager = rag_deps.sm
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "AI Response"
-            MockAIGenerator.return_value = mock_ai
+        mock_session = SimpleNamespace(
+            get_conversation_history=lambda session_id: None, add_exchange=Mock()
+        )
+        MockSessionManager.return_value = mock_session
 
-            from rag_system import RAGSystem
+        MockAIGenerator.return_value = stub_ai_generator("AI Response")
 
-            rag = RAGSystem(mock_config)
+        rag = RAGSystem(mock_config)
 
-            rag.query("User question", session_id="session_1")
+        rag.query("User question", session_id="session_1")
 
-            # Verify exchange was added
-            mock_session.add_exchange.assert_called_once()
-            call_args = mock_session.add_exchange.call_args[0]
-            assert (
-                "User question" in call_args[1]
-            )  # Original query is wrapped in prompt
-            assert call_args[2] == "AI Response"
+        # Verify exchange was added
+        mock_session.add_exchange.assert_called_once()
+        call_args = mock_session.add_exchange.call_args[0]
+        assert "User question" in call_args[1]  # Original query is wrapped in prompt
+        assert call_args[2] == "AI Response"
 
-    def test_query_passes_tools_to_ai_generator(self, mock_config):
+    def test_query_passes_tools_to_ai_generator(self, rag_deps, mock_config):
         """Test that query() provides tools to AIGenerator"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
-
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "Response"
-            MockAIGenerator.return_value = mock_ai
+        MockAIGenerator = rag_deps.ai
 
-            from rag_system import RAGSystem
+        mock_ai = Mock()
+        mock_ai.generate_response.return_value = "Response"
+        MockAIGenerator.return_value = mock_ai
 
-            rag = RAGSystem(mock_config)
+        rag = RAGSystem(mock_config)
 
-            rag.query("What is Python?")
+        rag.query("What is Python?")
 
-            call_args = mock_ai.generate_response.call_args
-            assert "tools" in call_args.kwargs
-            assert "tool_manager" in call_args.kwargs
-            assert call_args.kwargs["tools"] is not None
+        call_args = mock_ai.generate_response.call_args
+        assert "tools" in call_args.kwargs
+        assert "tool_manager" in call_args.kwargs
+        assert call_args.kwargs["tools"] is not None
 
-    def test_query_resets_sources_after_retrieval(self, mock_config):
+    def test_query_resets_sources_after_retrieval(self, rag_deps, mock_config):
         """Test that sources are reset after being retrieved"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        MockAIGenerator = rag_deps.ai
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "Response"
-            MockAIGenerator.return_value = mock_ai
+        MockAIGenerator.return_value = stub_ai_generator("Response")
 
-            from rag_system import RAGSystem
+        rag = RAGSystem(mock_config)
 
-            rag = RAGSystem(mock_config)
+        # Set up mock sources
+        rag.tool_manager.get_last_sources = Mock(return_value=[{"text": "Source 1"}])
+        rag.tool_manager.reset_sources = Mock()
 
-            # Set up mock sources
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[{"text": "Source 1"}]
-            )
-            rag.tool_manager.reset_sources = Mock()
+        rag.query("Question")
+
+        rag.tool_manager.reset_sources.assert_called_once()
+
+    def test_link_metadata_fetched_during_generation(self, rag_deps, mock_config):
+        """Test that course link metadata is fetched while the AI is responding"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        fetched = threading.Event()
+
+        def get_all_courses_metadata():
+            fetched.set()
+            return [{"title": "Python 101", "course_link": "https://example.com/py"}]
+
+        mock_vs = Mock()
+        mock_vs.get_all_courses_metadata.side_effect = get_all_courses_metadata
+        MockVectorStore.return_value = mock_vs
+
+        def generate_response(**kwargs):
+            # Only returns once the prefetch has run alongside it
+            assert fetched.wait(timeout=5)
+            return "Try Python 101."
+
+        mock_ai = Mock()
+        mock_ai.generate_response.side_effect = generate_response
+        MockAIGenerator.return_value = mock_ai
+
+        rag = RAGSystem(mock_config)
+
+        response, _ = rag.query("Where do I start?")
+
+        assert response == "Try [Python 101](https://example.com/py)."
+
+    def test_prefetch_and_tool_lookups_share_the_store(
+        self, rag_deps, mock_config, fake_vs
+    ):
+        """Test that prefetch and tool-time link lookups can hit one store at once"""
+        from models import Course, Lesson
+
+        course = Course(
+            title="Python 101",
+            course_link="https://example.com/py",
+            lessons=[
+                Lesson(lesson_number=1, title="Intro", lesson_link="https://e.com/1")
+            ],
+        )
+        fake_vs.add_course_metadata(course)
+        rag_deps.vs.return_value = fake_vs
+        started = threading.Barrier(2, timeout=5)
 
-            rag.query("Question")
+        read_catalog = fake_vs.get_all_courses_metadata
 
-            rag.tool_manager.reset_sources.assert_called_once()
+        def prefetch_reads():
+            started.wait()
+            for _ in range(200):
+                courses = read_catalog()
+            return courses
+
+        fake_vs.get_all_courses_metadata = prefetch_reads
+
+        def generate_response(**kwargs):
+            # Lesson lookups as CourseSearchTool makes them, racing the prefetch;
+            # each bump makes both threads write fresh cache entries
+            started.wait()
+            links = set()
+            for _ in range(200):
+                links.add(fake_vs.get_lesson_link("Python 101", 1))
+                fake_vs._bump_catalog_version()
+            assert links == {"https://e.com/1"}
+            return "Try Python 101."
+
+        mock_ai = Mock()
+        mock_ai.generate_response.side_effect = generate_response
+        rag_deps.ai.return_value = mock_ai
+
+        response, _ = RAGSystem(mock_config).query("Where do I start?")
+
+        assert response == "Try [Python 101](https://example.com/py)."
 
 
 class TestRAGSystemWithBrokenConfig:
@@ -179,14 +260,12 @@ class TestRAGSystemWithBrokenConfig:
         """Test that the correct config has positive MAX_RESULTS"""
         assert mock_config.MAX_RESULTS > 0, "Correct config should have MAX_RESULTS > 0"
 
-    def test_production_config_bug_detection(self):
+    def test_production_config_bug_detection(self, prod_config):
         """
         CRITICAL TEST: Detects if production config has the bug.
         This test will FAIL if MAX_RESULTS=0 in config.py
         """
-        from config import config
-
-        if config.MAX_RESULTS == 0:
+        if prod_config.MAX_RESULTS == 0:
             pytest.fail(
                 "BUG DETECTED: config.MAX_RESULTS is 0!\n"
                 "This causes VectorStore.search() to return no results.\n"
@@ -197,343 +276,577 @@ class TestRAGSystemWithBrokenConfig:
 class TestRAGSystemInitialization:
     """Test RAGSystem initialization and component wiring"""
 
-    def test_all_components_initialized(self, mock_config):
+    def test_all_components_initialized(self, rag_deps, mock_config):
         """Test that all required components are initialized"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        rag = RAGSystem(mock_config)
 
-            from rag_system import RAGSystem
+        assert rag.document_processor is not None
+        assert rag.vector_store is not None
+        assert rag.ai_generator is not None
+        assert rag.session_manager is not None
+        assert rag.tool_manager is not None
 
-            rag = RAGSystem(mock_config)
+    def test_search_tools_registered(self, rag_deps, mock_config):
+        """Test that search tools are registered with ToolManager"""
+        rag = RAGSystem(mock_config)
 
-            assert rag.document_processor is not None
-            assert rag.vector_store is not None
-            assert rag.ai_generator is not None
-            assert rag.session_manager is not None
-            assert rag.tool_manager is not None
+        tool_defs = rag.tool_manager.get_tool_definitions()
+        tool_names = [t["name"] for t in tool_defs]
 
-    def test_search_tools_registered(self, mock_config):
-        """Test that search tools are registered with ToolManager"""
-        with (
-            patch("rag_system.VectorStore"),
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        assert "search_course_content" in tool_names
+        assert "get_course_outline" in tool_names
 
-            from rag_system import RAGSystem
+    def test_heavy_components_built_on_first_use(self, rag_deps, mock_config):
+        """Test that the vector store and AI client load lazily, once"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            rag = RAGSystem(mock_config)
+        rag = RAGSystem(mock_config)
 
-            tool_defs = rag.tool_manager.get_tool_definitions()
-            tool_names = [t["name"] for t in tool_defs]
+        MockVectorStore.assert_not_called()
+        MockAIGenerator.assert_not_called()
 
-            assert "search_course_content" in tool_names
-            assert "get_course_outline" in tool_names
+        rag.tool_manager  # Tools need the vector store
+        assert rag.vector_store is rag.search_tool.store
+        MockVectorStore.assert_called_once()
+        MockAIGenerator.assert_not_called()
 
-    def test_vector_store_receives_max_results(self, mock_config):
-        """Test that VectorStore is initialized with MAX_RESULTS from config"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator"),
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+    def test_tools_available_before_tool_manager(self, rag_deps, mock_config):
+        """Test that the tools can be read first and are the registered ones"""
+        rag = RAGSystem(mock_config)
+
+        search_tool = rag.search_tool
 
-            from rag_system import RAGSystem
+        assert search_tool.store is rag.vector_store
+        assert rag.tool_manager.tools["search_course_content"] is search_tool
+        assert rag.outline_tool is rag.outline_tool
+        rag_deps.vs.assert_called_once()
+
+    def test_close_shuts_down_prefetch_pool(self, rag_deps, mock_config):
+        """Test that close() stops the link prefetch threads"""
+        rag = RAGSystem(mock_config)
+
+        rag.close()
+
+        with pytest.raises(RuntimeError):
+            rag._prefetch_pool.submit(rag._get_link_matcher)
+
+    def test_vector_store_receives_max_results(self, rag_deps, mock_config):
+        """Test that VectorStore is initialized with MAX_RESULTS from config"""
+        MockVectorStore = rag_deps.vs
 
-            RAGSystem(mock_config)
+        RAGSystem(mock_config).vector_store
 
-            # Verify VectorStore was called with max_results
-            call_args = MockVectorStore.call_args
-            assert call_args[0][2] == mock_config.MAX_RESULTS  # Third positional arg
+        # Verify VectorStore was called with max_results
+        call_args = MockVectorStore.call_args
+        assert call_args[0][2] == mock_config.MAX_RESULTS  # Third positional arg
 
 
 class TestRAGSystemAddCourseLinks:
-    """Test the _add_course_links method"""
+    """Test course title linking in _add_links"""
 
-    def test_add_course_links_replaces_course_titles(self, mock_config):
+    def test_add_course_links_replaces_course_titles(self, rag_deps, mock_config):
         """Test that course titles are replaced with markdown links"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = [
-                {"title": "Python 101", "course_link": "https://example.com/python"}
+        MockVectorStore.return_value = stub_vector_store(
+            [{"title": "Python 101", "course_link": "https://example.com/python"}]
+        )
+
+        MockAIGenerator.return_value = stub_ai_generator(
+            "Check out Python 101 for more info."
+        )
+
+        rag = RAGSystem(mock_config)
+
+        response, _ = rag.query("Tell me about Python")
+
+        # The response should have the link
+        assert response == (
+            "Check out [Python 101](https://example.com/python) for more info."
+        )
+
+    def test_add_course_links_prefers_longest_title(self, rag_deps, mock_config):
+        """Test that overlapping titles link the longest match and drop quotes"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        MockVectorStore.return_value = stub_vector_store(
+            [
+                {"title": "MCP", "course_link": "https://example.com/mcp"},
+                {"title": "MCP: Build Apps", "course_link": "https://example.com/apps"},
             ]
-            MockVectorStore.return_value = mock_vs
+        )
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = (
-                "Check out Python 101 for more info."
-            )
-            MockAIGenerator.return_value = mock_ai
+        MockAIGenerator.return_value = stub_ai_generator(
+            'Take "MCP: Build Apps" or MCP.'
+        )
 
-            from rag_system import RAGSystem
+        rag = RAGSystem(mock_config)
 
-            rag = RAGSystem(mock_config)
+        response, _ = rag.query("Which MCP course?")
+
+        assert response == (
+            "Take [MCP: Build Apps](https://example.com/apps) "
+            "or [MCP](https://example.com/mcp)."
+        )
+
+    def test_course_link_matcher_reused_until_catalog_changes(
+        self, rag_deps, mock_config
+    ):
+        """Test that course metadata is fetched once per catalog version"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        mock_vs = Mock()
+        mock_vs.catalog_version = 0
+        mock_vs.get_all_courses_metadata.return_value = [
+            {"title": "Python 101", "course_link": "https://example.com/python"}
+        ]
+        MockVectorStore.return_value = mock_vs
+
+        MockAIGenerator.return_value = stub_ai_generator('Try "Python 101" first.')
+
+        rag = RAGSystem(mock_config)
+
+        response, _ = rag.query("Where do I start?")
+        rag.query("Where do I start?")
+        assert response == "Try [Python 101](https://example.com/python) first."
+        assert mock_vs.get_all_courses_metadata.call_count == 1
 
-            response, _ = rag.query("Tell me about Python")
+        # Any write to the vector store bumps its catalog version
+        mock_vs.catalog_version = 1
+        rag.query("Where do I start?")
+        assert mock_vs.get_all_courses_metadata.call_count == 2
 
-            # The response should have the link
-            assert (
-                "[Python 101]" in response or "https://example.com/python" in response
+    def test_add_course_links_skips_already_linked_titles(self, rag_deps, mock_config):
+        """Test that titles already used as link text are not linked again"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        MockVectorStore.return_value = stub_vector_store(
+            [{"title": "Python 101", "course_link": "https://example.com/python"}]
+        )
+
+        linked = "See [Python 101](https://example.com/python) or Python 101."
+        MockAIGenerator.return_value = stub_ai_generator(linked)
+
+        rag = RAGSystem(mock_config)
+
+        response, _ = rag.query("Tell me about Python")
+
+        assert response == linked
+
+    def test_course_and_lesson_linked_in_one_pass(self, rag_deps, mock_config):
+        """Test that titles and lessons are linked together, skipping existing links"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        mock_vs = Mock()
+        mock_vs.get_all_courses_metadata.return_value = [
+            {"title": "Python 101", "course_link": "https://example.com/python"}
+        ]
+        mock_vs.get_lesson_links_bulk.return_value = {
+            2: "https://example.com/python/lesson2"
+        }
+        MockVectorStore.return_value = mock_vs
+
+        MockAIGenerator.return_value = stub_ai_generator(
+            (
+                "Python 101 covers this in Lesson 2, "
+                "see [Lesson 1](https://example.com/python/lesson1)."
             )
+        )
+
+        rag = RAGSystem(mock_config)
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[{"text": "Python 101 - Lesson 2", "link": None}]
+        )
+        rag.tool_manager.reset_sources = Mock()
+
+        response, _ = rag.query("Where is this covered?")
+
+        assert response == (
+            "[Python 101](https://example.com/python) covers this in "
+            "[Lesson 2](https://example.com/python/lesson2), "
+            "see [Lesson 1](https://example.com/python/lesson1)."
+        )
+        mock_vs.get_lesson_links_bulk.assert_called_once_with("Python 101", {2})
 
 
 class TestRAGSystemAddLessonLinks:
-    """Test the _add_lesson_links method"""
+    """Test lesson mention linking in _add_links"""
 
-    def test_add_lesson_links_converts_lesson_mentions(self, mock_config):
+    def test_add_lesson_links_converts_lesson_mentions(self, rag_deps, mock_config):
         """Test that 'Lesson X' mentions are converted to markdown links"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        MockVectorStore.return_value = stub_vector_store(
+            [], lesson_links={6: "https://example.com/python/lesson6"}
+        )
+
+        MockAIGenerator.return_value = stub_ai_generator(
+            "Check out Lesson 6 for more details."
+        )
+
+        rag = RAGSystem(mock_config)
+
+        # Mock sources with course context
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[
+                {
+                    "text": "Python 101 - Lesson 5",
+                    "link": "https://example.com/python/lesson5",
+                    "score": 85,
+                }
+            ]
+        )
+        rag.tool_manager.reset_sources = Mock()
 
-            mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
-            mock_vs.get_lesson_link.return_value = "https://example.com/python/lesson6"
-            MockVectorStore.return_value = mock_vs
+        response, _ = rag.query("Tell me about lesson 6")
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = (
-                "Check out Lesson 6 for more details."
-            )
-            MockAIGenerator.return_value = mock_ai
+        # Should have markdown link for Lesson 6
+        assert "[Lesson 6](https://example.com/python/lesson6)" in response
 
-            from rag_system import RAGSystem
+    def test_add_lesson_links_handles_lowercase(self, rag_deps, mock_config):
+        """Test that lowercase 'lesson X' is also converted"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            rag = RAGSystem(mock_config)
+        MockVectorStore.return_value = stub_vector_store(
+            [], lesson_links={7: "https://example.com/course/lesson7"}
+        )
 
-            # Mock sources with course context
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "Python 101 - Lesson 5",
-                        "link": "https://example.com/python/lesson5",
-                        "score": 85,
-                    }
-                ]
-            )
-            rag.tool_manager.reset_sources = Mock()
+        MockAIGenerator.return_value = stub_ai_generator("See lesson 7 for more info.")
 
-            response, _ = rag.query("Tell me about lesson 6")
+        rag = RAGSystem(mock_config)
 
-            # Should have markdown link for Lesson 6
-            assert "[Lesson 6](https://example.com/python/lesson6)" in response
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[
+                {
+                    "text": "MCP Course",
+                    "link": "https://example.com/course",
+                    "score": 100,
+                }
+            ]
+        )
+        rag.tool_manager.reset_sources = Mock()
 
-    def test_add_lesson_links_handles_lowercase(self, mock_config):
-        """Test that lowercase 'lesson X' is also converted"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        response, _ = rag.query("What about lesson 7?")
 
-            mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
-            mock_vs.get_lesson_link.return_value = "https://example.com/course/lesson7"
-            MockVectorStore.return_value = mock_vs
+        # Should preserve lowercase and add link
+        assert "[lesson 7](https://example.com/course/lesson7)" in response
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "See lesson 7 for more info."
-            MockAIGenerator.return_value = mock_ai
+    def test_add_lesson_links_handles_multiple_lessons(self, rag_deps, mock_config):
+        """Test that multiple lesson mentions are all converted"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        mock_vs = Mock()
+        mock_vs.get_all_courses_metadata.return_value = []
+        # Return different links based on lesson number
+        mock_vs.get_lesson_links_bulk.side_effect = lambda course, nums: {
+            num: f"https://example.com/lesson{num}" for num in nums
+        }
+        MockVectorStore.return_value = mock_vs
+
+        MockAIGenerator.return_value = stub_ai_generator(
+            ("Lesson 4 covers basics, Lesson 5 is advanced.")
+        )
+
+        rag = RAGSystem(mock_config)
+
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[
+                {
+                    "text": "Python Course",
+                    "link": "https://example.com/python",
+                    "score": 100,
+                }
+            ]
+        )
+        rag.tool_manager.reset_sources = Mock()
 
-            from rag_system import RAGSystem
+        response, _ = rag.query("Compare lessons 4 and 5")
 
-            rag = RAGSystem(mock_config)
+        assert "[Lesson 4](https://example.com/lesson4)" in response
+        assert "[Lesson 5](https://example.com/lesson5)" in response
 
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "MCP Course",
-                        "link": "https://example.com/course",
-                        "score": 100,
-                    }
-                ]
-            )
-            rag.tool_manager.reset_sources = Mock()
+    def test_add_lesson_links_no_sources_returns_unchanged(self, rag_deps, mock_config):
+        """Test that response is unchanged when no sources available"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            response, _ = rag.query("What about lesson 7?")
+        MockVectorStore.return_value = stub_vector_store([])
 
-            # Should preserve lowercase and add link
-            assert "[lesson 7](https://example.com/course/lesson7)" in response
+        MockAIGenerator.return_value = stub_ai_generator("Check Lesson 6 for details.")
 
-    def test_add_lesson_links_handles_multiple_lessons(self, mock_config):
-        """Test that multiple lesson mentions are all converted"""
-        with (
-            patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
-            patch("rag_system.SessionManager"),
-        ):
+        rag = RAGSystem(mock_config)
 
-            mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
-            # Return different links based on lesson number
-            mock_vs.get_lesson_link.side_effect = (
-                lambda course, num: f"https://example.com/lesson{num}"
-            )
-            MockVectorStore.return_value = mock_vs
+        # No sources - empty list
+        rag.tool_manager.get_last_sources = Mock(return_value=[])
+        rag.tool_manager.reset_sources = Mock()
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = (
-                "Lesson 4 covers basics, Lesson 5 is advanced."
-            )
-            MockAIGenerator.return_value = mock_ai
+        response, _ = rag.query("Tell me about lesson 6")
 
-            from rag_system import RAGSystem
+        # Should remain as plain text (no link)
+        assert "Lesson 6" in response
+        assert "[Lesson 6]" not in response
 
-            rag = RAGSystem(mock_config)
+    def test_add_lesson_links_no_link_found_returns_unchanged(
+        self, rag_deps, mock_config
+    ):
+        """Test that lesson mention stays as text if link not found"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
 
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "Python Course",
-                        "link": "https://example.com/python",
-                        "score": 100,
-                    }
-                ]
-            )
-            rag.tool_manager.reset_sources = Mock()
+        # No link found for any lesson
+        MockVectorStore.return_value = stub_vector_store([], lesson_links={})
 
-            response, _ = rag.query("Compare lessons 4 and 5")
+        MockAIGenerator.return_value = stub_ai_generator("See Lesson 99 for details.")
 
-            assert "[Lesson 4](https://example.com/lesson4)" in response
-            assert "[Lesson 5](https://example.com/lesson5)" in response
+        rag = RAGSystem(mock_config)
+
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[
+                {
+                    "text": "Python Course",
+                    "link": "https://example.com",
+                    "score": 100,
+                }
+            ]
+        )
+        rag.tool_manager.reset_sources = Mock()
+
+        response, _ = rag.query("What about lesson 99?")
+
+        # Should remain as plain text since link not found
+        assert "Lesson 99" in response
+        assert "[Lesson 99]" not in response
+
+    def test_add_lesson_links_uses_most_common_course(self, rag_deps, mock_config):
+        """Test that the most common course in sources is used for link lookup"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        mock_vs = Mock()
+        mock_vs.get_all_courses_metadata.return_value = []
+        mock_vs.get_lesson_links_bulk.return_value = {
+            5: "https://example.com/mcp/lesson5"
+        }
+        MockVectorStore.return_value = mock_vs
+
+        MockAIGenerator.return_value = stub_ai_generator("Lesson 5 covers this topic.")
+
+        rag = RAGSystem(mock_config)
+
+        # MCP Course appears 3 times, Python Course once
+        rag.tool_manager.get_last_sources = Mock(
+            return_value=[
+                {
+                    "text": "MCP Course - Lesson 1",
+                    "link": "https://example.com/mcp/1",
+                    "score": 90,
+                },
+                {
+                    "text": "MCP Course - Lesson 2",
+                    "link": "https://example.com/mcp/2",
+                    "score": 85,
+                },
+                {
+                    "text": "Python Course - Lesson 3",
+                    "link": "https://example.com/py/3",
+                    "score": 80,
+                },
+                {
+                    "text": "MCP Course - Lesson 4",
+                    "link": "https://example.com/mcp/4",
+                    "score": 75,
+                },
+            ]
+        )
+        rag.tool_manager.reset_sources = Mock()
+
+        response, _ = rag.query("Tell me about lesson 5")
+
+        # Should look up links for MCP Course (most common)
+        mock_vs.get_lesson_links_bulk.assert_called_once_with("MCP Course", {5})
+
+
+class TestRAGSystemQueryCache:
+    """Test the opt-in semantic query cache in query()"""
+
+    def test_repeated_query_served_from_cache(self, rag_deps, mock_config):
+        """Test that a repeated question skips the AI generator"""
+        # mock_config is session-scoped, so enable the cache on a copy
+        config = replace(mock_config, SEMANTIC_CACHE_ENABLED=True)
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+
+        mock_vs = Mock()
+        mock_vs.get_all_courses_metadata.return_value = []
+        mock_vs.embed.side_effect = lambda texts: [[1.0, 0.0]]
+        MockVectorStore.return_value = mock_vs
+
+        mock_ai = Mock()
+        mock_ai.generate_response.return_value = "Python is great!"
+        MockAIGenerator.return_value = mock_ai
+
+        rag = RAGSystem(config)
+
+        first, _ = rag.query("What is Python?", session_id="session_1")
+        second, _ = rag.query("What is Python?", session_id="session_1")
+
+        assert first == second == "Python is great!"
+        mock_ai.generate_response.assert_called_once()
+
+
+class TestRAGSystemQueryStream:
+    """Test RAGSystem.query_stream() paragraph streaming"""
+
+    def test_paragraphs_linked_and_sources_last(self, rag_deps, mock_config):
+        """Test that each paragraph is linked as it completes, then sources follow"""
+        MockVectorStore = rag_deps.vs
+        MockAIGenerator = rag_deps.ai
+        MockSessionManager = rag_deps.sm
+
+        MockVectorStore.return_value = stub_vector_store(
+            [{"title": "Python 101", "course_link": "https://example.com/python"}]
+        )
+
+        mock_ai = Mock()
+        mock_ai.generate_response_stream.return_value = iter(
+            ["Start with Pyth", "on 101.\n", "\nThen practice."]
+        )
+        MockAIGenerator.return_value = mock_ai
+
+        rag = RAGSystem(mock_config)
+        sources = [{"text": "Python 101 - Lesson 1", "link": None}]
+        rag.tool_manager.get_last_sources = Mock(return_value=sources)
+        rag.tool_manager.reset_sources = Mock()
+
+        events = list(rag.query_stream("Where do I start?", "session_1"))
+
+        assert events == [
+            ("Start with [Python 101](https://example.com/python).\n\n", None),
+            ("Then practice.", None),
+            ("", sources),
+        ]
+        MockSessionManager.return_value.add_exchange.assert_called_once_with(
+            "session_1",
+            "Where do I start?",
+            "Start with [Python 101](https://example.com/python).\n\n" "Then practice.",
+        )
+        rag.tool_manager.reset_sources.assert_called_once()
+
+
+class TestRAGSystemAddCourseFolder:
+    """Test add_course_folder() ingestion"""
+
+    @staticmethod
+    def write_course(folder, file_name, title):
+        (folder / file_name).write_text(
+            f"Course Title: {title}\n"
+            "Course Link: https://example.com\n"
+            "Course Instructor: Test\n"
+            "\n"
+            "Lesson 1: Basics\n"
+            f"This lesson introduces {title}. It covers the fundamentals.\n"
+        )
+
+    def test_new_courses_embedded_in_one_batch(self, mock_config, tmp_path):
+        """Test that all new courses and their chunks are stored in bulk calls"""
+        self.write_course(tmp_path, "a.txt", "Course A")
+        self.write_course(tmp_path, "b.txt", "Course B")
+        (tmp_path / "notes.md").write_text("ignored")
 
-    def test_add_lesson_links_no_sources_returns_unchanged(self, mock_config):
-        """Test that response is unchanged when no sources available"""
         with (
             patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.AIGenerator"),
             patch("rag_system.SessionManager"),
         ):
 
             mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
+            mock_vs.get_existing_course_titles.return_value = ["Course B"]
             MockVectorStore.return_value = mock_vs
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "Check Lesson 6 for details."
-            MockAIGenerator.return_value = mock_ai
-
-            from rag_system import RAGSystem
-
             rag = RAGSystem(mock_config)
 
-            # No sources - empty list
-            rag.tool_manager.get_last_sources = Mock(return_value=[])
-            rag.tool_manager.reset_sources = Mock()
+            courses, chunks = rag.add_course_folder(str(tmp_path))
 
-            response, _ = rag.query("Tell me about lesson 6")
+            assert courses == 1
+            mock_vs.add_course_metadata_bulk.assert_called_once()
+            stored_courses = mock_vs.add_course_metadata_bulk.call_args[0][0]
+            assert [course.title for course in stored_courses] == ["Course A"]
+            mock_vs.add_course_content.assert_called_once()
+            stored = mock_vs.add_course_content.call_args[0][0]
+            assert len(stored) == chunks
+            assert {chunk.course_title for chunk in stored} == {"Course A"}
 
-            # Should remain as plain text (no link)
-            assert "Lesson 6" in response
-            assert "[Lesson 6]" not in response
+    def test_existing_courses_skipped_before_processing(self, mock_config, tmp_path):
+        """Test that files whose header names a known course are never parsed"""
+        self.write_course(tmp_path, "a.txt", "Course A")
 
-    def test_add_lesson_links_no_link_found_returns_unchanged(self, mock_config):
-        """Test that lesson mention stays as text if link not found"""
         with (
             patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.AIGenerator"),
             patch("rag_system.SessionManager"),
         ):
 
             mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
-            mock_vs.get_lesson_link.return_value = None  # No link found
+            mock_vs.get_existing_course_titles.return_value = ["Course A"]
             MockVectorStore.return_value = mock_vs
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "See Lesson 99 for details."
-            MockAIGenerator.return_value = mock_ai
-
-            from rag_system import RAGSystem
-
             rag = RAGSystem(mock_config)
 
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "Python Course",
-                        "link": "https://example.com",
-                        "score": 100,
-                    }
-                ]
-            )
-            rag.tool_manager.reset_sources = Mock()
+            with patch.object(
+                rag.document_processor, "process_course_document"
+            ) as mock_process:
+                assert rag.add_course_folder(str(tmp_path)) == (0, 0)
 
-            response, _ = rag.query("What about lesson 99?")
+            mock_process.assert_not_called()
+            mock_vs.add_course_metadata_bulk.assert_not_called()
 
-            # Should remain as plain text since link not found
-            assert "Lesson 99" in response
-            assert "[Lesson 99]" not in response
+    def test_failures_reported_together(self, mock_config, tmp_path, capsys):
+        """Test that unreadable files are collected and logged in one report"""
+        self.write_course(tmp_path, "a.txt", "Course A")
+        self.write_course(tmp_path, "b.txt", "Course B")
 
-    def test_add_lesson_links_uses_most_common_course(self, mock_config):
-        """Test that the most common course in sources is used for link lookup"""
         with (
             patch("rag_system.VectorStore") as MockVectorStore,
-            patch("rag_system.AIGenerator") as MockAIGenerator,
-            patch("rag_system.DocumentProcessor"),
+            patch("rag_system.AIGenerator"),
             patch("rag_system.SessionManager"),
         ):
 
             mock_vs = Mock()
-            mock_vs.get_all_courses_metadata.return_value = []
-            mock_vs.get_lesson_link.return_value = "https://example.com/mcp/lesson5"
+            mock_vs.get_existing_course_titles.return_value = []
             MockVectorStore.return_value = mock_vs
 
-            mock_ai = Mock()
-            mock_ai.generate_response.return_value = "Lesson 5 covers this topic."
-            MockAIGenerator.return_value = mock_ai
+            rag = RAGSystem(mock_config)
 
-            from rag_system import RAGSystem
+            with patch.object(
+                rag.document_processor,
+                "peek_course_title",
+                side_effect=OSError("permission denied"),
+            ):
+                assert rag.add_course_folder(str(tmp_path)) == (0, 0)
 
-            rag = RAGSystem(mock_config)
+            output = capsys.readouterr().out
+            assert "Error processing a.txt: permission denied" in output
+            assert "Error processing b.txt: permission denied" in output
 
-            # MCP Course appears 3 times, Python Course once
-            rag.tool_manager.get_last_sources = Mock(
-                return_value=[
-                    {
-                        "text": "MCP Course - Lesson 1",
-                        "link": "https://example.com/mcp/1",
-                        "score": 90,
-                    },
-                    {
-                        "text": "MCP Course - Lesson 2",
-                        "link": "https://example.com/mcp/2",
-                        "score": 85,
-                    },
-                    {
-                        "text": "Python Course - Lesson 3",
-                        "link": "https://example.com/py/3",
-                        "score": 80,
-                    },
-                    {
-                        "text": "MCP Course - Lesson 4",
-                        "link": "https://example.com/mcp/4",
-                        "score": 75,
-                    },
-                ]
-            )
-            rag.tool_manager.reset_sources = Mock()
+    def test_safe_process_captures_errors(self, mock_config, tmp_path):
+        """Test that a failed parse comes back as a result instead of raising"""
+        from document_processor import DocumentProcessor
+
+        processor = DocumentProcessor(mock_config.CHUNK_SIZE, mock_config.CHUNK_OVERLAP)
+        missing = str(tmp_path / "missing.txt")
 
-            response, _ = rag.query("Tell me about lesson 5")
+        result = processor.safe_process(missing)
 
-            # Should call get_lesson_link with MCP Course (most common)
-            mock_vs.get_lesson_link.assert_called_with("MCP Course", 5)
+        assert not result.ok
+        assert result.course is None
+        assert result.file == missing
+        assert result.error
@@ -10,29 +10,30 @@ These tests isolate the CourseSearchTool to verify:
 """
 
 import pytest
-import sys
-import os
 from unittest.mock import Mock
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from search_tools import CourseSearchTool, CourseOutlineTool, ToolManager
-from vector_store import SearchResults
+from search_tools import (
+    EMPTY_RESULT_MSG,
+    CourseSearchTool,
+    CourseOutlineTool,
+    ToolManager,
+)
+from search_results import SearchResults
 
 
 class TestCourseSearchToolExecute:
     """Test CourseSearchTool.execute() method (lines 52-86)"""
 
     def test_execute_returns_formatted_results(
-        self, mock_vector_store, sample_search_results
+        self, mock_vector_store_spied, sample_search_results
     ):
         """Test that execute() returns properly formatted search results"""
-        tool = CourseSearchTool(mock_vector_store)
+        tool = CourseSearchTool(mock_vector_store_spied)
 
         result = tool.execute(query="Python programming")
 
         # Verify VectorStore.search was called correctly
-        mock_vector_store.search.assert_called_once_with(
+        mock_vector_store_spied.search.assert_called_once_with(
             query="Python programming", course_name=None, lesson_number=None
         )
 
@@ -41,87 +42,69 @@ class TestCourseSearchToolExecute:
         assert "Lesson 1" in result
         assert "Python is a programming language" in result
 
-    def test_execute_with_course_filter(self, mock_vector_store):
-        """Test execute() with course_name filter"""
-        tool = CourseSearchTool(mock_vector_store)
-
-        tool.execute(query="variables", course_name="Python")
-
-        mock_vector_store.search.assert_called_once_with(
-            query="variables", course_name="Python", lesson_number=None
-        )
-
-    def test_execute_with_lesson_filter(self, mock_vector_store):
-        """Test execute() with lesson_number filter"""
-        tool = CourseSearchTool(mock_vector_store)
-
-        tool.execute(query="basics", lesson_number=1)
-
-        mock_vector_store.search.assert_called_once_with(
-            query="basics", course_name=None, lesson_number=1
-        )
-
-    def test_execute_with_both_filters(self, mock_vector_store):
-        """Test execute() with both course and lesson filters"""
-        tool = CourseSearchTool(mock_vector_store)
-
-        tool.execute(query="syntax", course_name="Python", lesson_number=2)
-
-        mock_vector_store.search.assert_called_once_with(
-            query="syntax", course_name="Python", lesson_number=2
-        )
-
+    @pytest.mark.parametrize(
+        "kwargs,expected_call",
+        [
+            pytest.param(
+                {"query": "variables", "course_name": "Python"},
+                {"query": "variables", "course_name": "Python", "lesson_number": None},
+                id="course_filter",
+            ),
+            pytest.param(
+                {"query": "basics", "lesson_number": 1},
+                {"query": "basics", "course_name": None, "lesson_number": 1},
+                id="lesson_filter",
+            ),
+            pytest.param(
+                {"query": "syntax", "course_name": "Python", "lesson_number": 2},
+                {"query": "syntax", "course_name": "Python", "lesson_number": 2},
+                id="both_filters",
+            ),
+        ],
+    )
+    def test_execute_with_filters(self, mock_vector_store_spied, kwargs, expected_call):
+        """Test execute() passes course and lesson filters to the search"""
+        tool = CourseSearchTool(mock_vector_store_spied)
+
+        tool.execute(**kwargs)
+
+        mock_vector_store_spied.search.assert_called_once_with(**expected_call)
+
+    @pytest.mark.parametrize(
+        "kwargs,filter_info",
+        [
+            pytest.param({"query": "nonexistent topic"}, "", id="no_filter"),
+            pytest.param(
+                {"query": "topic", "course_name": "Python"},
+                " in course 'Python'",
+                id="course_filter",
+            ),
+            pytest.param(
+                {"query": "topic", "lesson_number": 5},
+                " in lesson 5",
+                id="lesson_filter",
+            ),
+            pytest.param(
+                {"query": "topic", "course_name": "Python", "lesson_number": 5},
+                " in course 'Python' in lesson 5",
+                id="both_filters",
+            ),
+        ],
+    )
     def test_execute_handles_empty_results(
-        self, mock_vector_store, empty_search_results
+        self, mock_vector_store, empty_search_results, kwargs, filter_info
     ):
-        """Test that execute() returns appropriate message for empty results"""
-        mock_vector_store.search.return_value = empty_search_results
+        """Test the empty results message, including any filter information"""
+        mock_vector_store.search_results = empty_search_results
         tool = CourseSearchTool(mock_vector_store)
 
-        result = tool.execute(query="nonexistent topic")
+        result = tool.execute(**kwargs)
 
-        assert "No relevant content found" in result
-
-    def test_execute_handles_empty_results_with_course_filter(
-        self, mock_vector_store, empty_search_results
-    ):
-        """Test empty results message includes course filter information"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        result = tool.execute(query="topic", course_name="Python")
-
-        assert "No relevant content found" in result
-        assert "course 'Python'" in result
-
-    def test_execute_handles_empty_results_with_lesson_filter(
-        self, mock_vector_store, empty_search_results
-    ):
-        """Test empty results message includes lesson filter information"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        result = tool.execute(query="topic", lesson_number=5)
-
-        assert "No relevant content found" in result
-        assert "lesson 5" in result
-
-    def test_execute_handles_empty_results_with_both_filters(
-        self, mock_vector_store, empty_search_results
-    ):
-        """Test empty results message includes both filter information"""
-        mock_vector_store.search.return_value = empty_search_results
-        tool = CourseSearchTool(mock_vector_store)
-
-        result = tool.execute(query="topic", course_name="Python", lesson_number=5)
-
-        assert "No relevant content found" in result
-        assert "course 'Python'" in result
-        assert "lesson 5" in result
+        assert result == f"{EMPTY_RESULT_MSG}{filter_info}."
 
     def test_execute_handles_error(self, mock_vector_store, error_search_results):
         """Test that execute() returns error message when search fails"""
-        mock_vector_store.search.return_value = error_search_results
+        mock_vector_store.search_results = error_search_results
         tool = CourseSearchTool(mock_vector_store)
 
         result = tool.execute(query="anything")
@@ -196,7 +179,7 @@ class TestCourseOutlineTool:
 
     def test_execute_handles_no_course_found(self, mock_vector_store):
         """Test error handling when course not found"""
-        mock_vector_store.course_catalog.query.return_value = {
+        mock_vector_store.catalog_query_result = {
             "documents": [[]],
             "metadatas": [[]],
             "distances": [[]],
@@ -219,7 +202,10 @@ class TestToolManager:
         manager.register_tool(tool)
         result = manager.execute_tool("search_course_content", query="Python")
 
-        assert "Python" in result or "Introduction" in result
+        assert result == (
+            "[Introduction to Python - Lesson 1]\n"
+            "Python is a programming language that is widely used for web development."
+        )
 
     def test_execute_nonexistent_tool(self):
         """Test executing a tool that doesn't exist"""
@@ -245,6 +231,20 @@ class TestToolManager:
         assert "search_course_content" in names
         assert "get_course_outline" in names
 
+    def test_get_tool_definitions_reused_until_registration(self, mock_vector_store):
+        """Test that definitions are built once and rebuilt after a new tool"""
+        manager = ToolManager()
+        manager.register_tool(CourseSearchTool(mock_vector_store))
+
+        first = manager.get_tool_definitions()
+        assert manager.get_tool_definitions() is first
+
+        manager.register_tool(CourseOutlineTool(mock_vector_store))
+        second = manager.get_tool_definitions()
+
+        assert second is not first
+        assert len(second) == 2
+
     def test_get_last_sources(self, mock_vector_store, sample_search_results):
         """Test retrieving sources after tool execution"""
         manager = ToolManager()
@@ -9,16 +9,181 @@ causes empty search results - the root cause of "query failed".
 """
 
 import pytest
-import sys
+import json
 import os
+import shutil
 import tempfile
-from unittest.mock import Mock, patch
+from pathlib import Path
+from unittest.mock import patch
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from vector_store import VectorStore, SearchResults
+from search_results import SearchResults
+from vector_store import VectorStore
 from models import Course, Lesson, CourseChunk
 
+# Sentence-transformer model for shared_vs, e.g. all-MiniLM-L6-v2; unset uses
+# StubEmbedding, since none of these tests depend on ranking quality
+TEST_EMBEDDING_MODEL = os.environ.get("TEST_EMBEDDING_MODEL")
+
+ZERO_MAX_RESULTS_MSG = (
+    "\n\n"
+    "============================================================\n"
+    "BUG DETECTED: config.MAX_RESULTS is {}!\n"
+    "============================================================\n"
+    "\n"
+    "This causes VectorStore.search() to return no results because:\n"
+    "  - VectorStore passes n_results=0 to ChromaDB\n"
+    "  - ChromaDB returns empty results\n"
+    "  - CourseSearchTool returns 'No relevant content found'\n"
+    "  - The chatbot appears to be 'failing'\n"
+    "\n"
+    "FIX: Change line 21 in backend/config.py from:\n"
+    "    MAX_RESULTS: int = 0\n"
+    "to:\n"
+    "    MAX_RESULTS: int = 5\n"
+    "============================================================\n"
+)
+
+
+@pytest.fixture(scope="session")
+def chroma_dir(tmp_path_factory):
+    """
+    Factory for throwaway Chroma directories, on tmpfs where available.
+
+    Like tmp_path_factory, directories share one root that is removed once
+    at session end rather than after each test.
+
+    Chroma 1.x drives SQLite from its Rust bindings, so journal/synchronous
+    pragmas can't be set from Python; on tmpfs its fsyncs cost nothing anyway.
+    """
+    shm = Path("/dev/shm")
+    if not (shm.is_dir() and os.access(shm, os.W_OK)):
+        yield lambda name: str(tmp_path_factory.mktemp(name))
+        return
+    root = tempfile.mkdtemp(prefix="chroma-tests-", dir=shm)
+    yield lambda name: tempfile.mkdtemp(prefix=f"{name}-", dir=root)
+    shutil.rmtree(root, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def embedding_cache_path(chroma_dir):
+    """One EmbeddingCache file per session, so repeated texts embed only once"""
+    return os.path.join(chroma_dir("embedding_cache"), "embeddings.db")
+
+
+def make_store(path, stub_embedding, embedding_model=None, embedding_cache_path=None):
+    """A real Chroma store on path, using stub_embedding unless a model is named"""
+    if embedding_model:
+        return VectorStore(
+            path,
+            embedding_model,
+            max_results=5,
+            embedding_cache_path=embedding_cache_path,
+        )
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(
+            "vector_store.chromadb.utils.embedding_functions."
+            "SentenceTransformerEmbeddingFunction",
+            lambda model_name: stub_embedding,
+        )
+        return VectorStore(path, "all-MiniLM-L6-v2", max_results=5)
+
+
+@pytest.fixture(scope="module")
+def shared_vs(chroma_dir, stub_embedding, embedding_cache_path):
+    """One VectorStore per module, so ChromaDB and any model start up once"""
+    vs = make_store(
+        chroma_dir("chroma"),
+        stub_embedding,
+        TEST_EMBEDDING_MODEL,
+        # Model embeddings go through the app's cache; stub ones are cheaper
+        embedding_cache_path=embedding_cache_path,
+    )
+    # Warm up the model here so first-call setup isn't charged to a test
+    vs.embed(["warmup"])
+    return vs
+
+
+@pytest.fixture(scope="module")
+def shared_vs_with_python_chunk(shared_vs, python101_chunk):
+    """The shared VectorStore holding just python101_chunk"""
+    shared_vs.add_course_content([python101_chunk])
+    return shared_vs
+
+
+@pytest.fixture(scope="module")
+def empty_vs(chroma_dir, stub_embedding):
+    """A hash-embedded store with nothing in it; tests only read from it"""
+    return make_store(chroma_dir("empty"), stub_embedding)
+
+
+@pytest.fixture(scope="module")
+def vs_with_two_courses(
+    chroma_dir, stub_embedding, python101_course, python101_chunk, js101_chunk
+):
+    """A hash-embedded store with Python 101 (lessons 1 and 2) and JS 101 content"""
+    vs = make_store(chroma_dir("two_courses"), stub_embedding)
+    vs.add_course_metadata(python101_course)
+    vs.add_course_content(
+        [
+            python101_chunk,
+            js101_chunk,
+            CourseChunk(
+                content="Advanced Python topics",
+                course_title="Python 101",
+                lesson_number=2,
+                chunk_index=2,
+            ),
+        ]
+    )
+    return vs
+
+
+@pytest.fixture(scope="module")
+def python101_chunk():
+    """A Python 101 lesson 1 chunk, shared read-only by the module"""
+    return CourseChunk(
+        content="Python programming basics and fundamentals",
+        course_title="Python 101",
+        lesson_number=1,
+        chunk_index=0,
+    )
+
+
+@pytest.fixture(scope="module")
+def js101_chunk():
+    """A chunk from a second course, for filter tests"""
+    return CourseChunk(
+        content="JavaScript basics",
+        course_title="JS 101",
+        lesson_number=1,
+        chunk_index=1,
+    )
+
+
+@pytest.fixture(scope="module")
+def python101_course():
+    """Catalog entry matching python101_chunk, for course name resolution"""
+    return Course(
+        title="Python 101", course_link="http://example.com", instructor="Test"
+    )
+
+
+@pytest.fixture(scope="module")
+def course_with_lesson():
+    """A catalog entry with one linked lesson"""
+    return Course(
+        title="Test Course",
+        course_link="https://example.com",
+        instructor="Test Instructor",  # ChromaDB requires non-None metadata values
+        lessons=[
+            Lesson(
+                lesson_number=1,
+                title="Lesson 1",
+                lesson_link="https://example.com/lesson1",
+            )
+        ],
+    )
+
 
 class TestSearchResults:
     """Test SearchResults dataclass"""
@@ -69,302 +234,276 @@ class TestSearchResults:
 class TestVectorStoreSearch:
     """Test VectorStore.search() method - critical for identifying bug"""
 
-    @pytest.fixture
-    def temp_chroma_path(self):
-        """Create temporary directory for ChromaDB"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            yield tmpdir
-
-    def test_search_with_zero_max_results_returns_empty(self, temp_chroma_path):
+    @pytest.mark.parametrize(
+        "max_results,limit,expect_empty",
+        [
+            # BUG: MAX_RESULTS=0 in production config is the root cause of
+            # "query failed" - search returns nothing
+            pytest.param(0, None, True, id="zero_max_results_returns_empty"),
+            pytest.param(5, None, False, id="positive_max_results_returns_data"),
+            pytest.param(0, 5, False, id="limit_overrides_max_results"),
+        ],
+    )
+    def test_search_max_results_matrix(
+        self, shared_vs_with_python_chunk, monkeypatch, max_results, limit, expect_empty
+    ):
         """
-        CRITICAL BUG TEST: Demonstrates that MAX_RESULTS=0 returns no results
-
-        This is the root cause of "query failed" - config.py has MAX_RESULTS=0
+        CRITICAL BUG TEST: Demonstrates that MAX_RESULTS=0 returns no results,
+        and that an explicit limit overrides max_results
         """
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=0,  # BUG: This is set to 0 in production config
-        )
+        vs = shared_vs_with_python_chunk
+        # The store is shared by the module, so restore max_results afterwards
+        monkeypatch.setattr(vs, "max_results", max_results)
 
-        # Add some test data
-        chunks = [
-            CourseChunk(
-                content="Python programming basics and fundamentals",
-                course_title="Python 101",
-                lesson_number=1,
-                chunk_index=0,
-            )
-        ]
-        vs.add_course_content(chunks)
-
-        # Search should return empty due to max_results=0
-        results = vs.search(query="Python")
-
-        # This demonstrates the bug - no results returned
-        assert (
-            results.is_empty()
-        ), "With max_results=0, search returns empty results - THIS IS THE BUG"
-
-    def test_search_with_positive_max_results_returns_data(self, temp_chroma_path):
-        """Test that search works correctly with positive MAX_RESULTS"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,  # Correct value
-        )
+        results = vs.search(query="Python", limit=limit)
 
-        # Add some test data
-        chunks = [
-            CourseChunk(
-                content="Python programming basics and fundamentals",
-                course_title="Python 101",
-                lesson_number=1,
-                chunk_index=0,
-            )
-        ]
-        vs.add_course_content(chunks)
-
-        # Search should return results
-        results = vs.search(query="Python")
-
-        assert (
-            not results.is_empty()
-        ), "With max_results=5, search should return results"
-        assert "Python" in results.documents[0]
-
-    def test_search_uses_limit_parameter_over_max_results(self, temp_chroma_path):
-        """Test that limit parameter overrides max_results"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=0,  # Would return nothing
+        assert results.is_empty() == expect_empty, (
+            f"With max_results={max_results} and limit={limit}, search should"
+            f" {'return empty results' if expect_empty else 'return results'}"
         )
+        if not expect_empty:
+            assert "Python" in results.documents[0]
 
-        # Add test data
-        chunks = [
-            CourseChunk(
-                content="Python programming",
-                course_title="Python 101",
-                lesson_number=1,
-                chunk_index=0,
-            )
-        ]
-        vs.add_course_content(chunks)
-
-        # Search with explicit limit should work
-        results = vs.search(query="Python", limit=5)
-
-        assert not results.is_empty(), "Explicit limit should override max_results=0"
-
-    def test_search_with_course_filter(self, temp_chroma_path):
+    def test_search_with_course_filter(self, vs_with_two_courses):
         """Test search filtering by course name"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
-
-        # Add course metadata for resolution
-        course = Course(
-            title="Python 101", course_link="http://example.com", instructor="Test"
-        )
-        vs.add_course_metadata(course)
-
-        # Add chunks for multiple courses
-        chunks = [
-            CourseChunk(
-                content="Python basics",
-                course_title="Python 101",
-                lesson_number=1,
-                chunk_index=0,
-            ),
-            CourseChunk(
-                content="JavaScript basics",
-                course_title="JS 101",
-                lesson_number=1,
-                chunk_index=1,
-            ),
-        ]
-        vs.add_course_content(chunks)
-
-        results = vs.search(query="basics", course_name="Python")
-
+        vs = vs_with_two_courses
+        with patch.object(
+            vs.course_content, "query", wraps=vs.course_content.query
+        ) as query:
+            results = vs.search(query="basics", course_name="Python")
+
+        # The filter is pushed down to Chroma rather than applied afterwards
+        assert query.call_args.kwargs["where"] == {"course_title": "Python 101"}
+        assert query.call_args.kwargs["n_results"] == vs.max_results
         # Should only return Python course content
         assert not results.is_empty()
         for meta in results.metadata:
             assert meta["course_title"] == "Python 101"
 
-    def test_search_nonexistent_course_returns_error(self, temp_chroma_path):
-        """Test that searching for nonexistent course returns error"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
+    def test_search_with_course_and_lesson_filter(self, vs_with_two_courses):
+        """Test that course and lesson filters are combined into one $and clause"""
+        vs = vs_with_two_courses
+        with patch.object(
+            vs.course_content, "query", wraps=vs.course_content.query
+        ) as query:
+            results = vs.search(query="Python", course_name="Python", lesson_number=2)
 
-        results = vs.search(query="anything", course_name="Nonexistent Course")
+        assert query.call_args.kwargs["where"] == {
+            "$and": [{"course_title": "Python 101"}, {"lesson_number": 2}]
+        }
+        assert results.documents == ["Advanced Python topics"]
+
+    def test_search_nonexistent_course_returns_error(self, empty_vs):
+        """Test that searching for nonexistent course returns error"""
+        results = empty_vs.search(query="anything", course_name="Nonexistent Course")
 
         assert results.error is not None
         assert "No course found" in results.error
 
-    def test_search_with_lesson_filter(self, temp_chroma_path):
+    def test_search_with_lesson_filter(self, vs_with_two_courses):
         """Test search filtering by lesson number"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
-
-        # Add chunks for different lessons
-        chunks = [
-            CourseChunk(
-                content="Introduction to Python",
-                course_title="Python 101",
-                lesson_number=1,
-                chunk_index=0,
-            ),
-            CourseChunk(
-                content="Advanced Python topics",
-                course_title="Python 101",
-                lesson_number=2,
-                chunk_index=1,
-            ),
-        ]
-        vs.add_course_content(chunks)
-
-        results = vs.search(query="Python", lesson_number=1)
-
-        assert not results.is_empty()
+        vs = vs_with_two_courses
+        with patch.object(
+            vs.course_content, "query", wraps=vs.course_content.query
+        ) as query:
+            results = vs.search(query="Python", lesson_number=2)
+
+        assert query.call_args.kwargs["where"] == {"lesson_number": 2}
+        assert query.call_args.kwargs["n_results"] == vs.max_results
+        assert results.documents == ["Advanced Python topics"]
         for meta in results.metadata:
-            assert meta["lesson_number"] == 1
+            assert meta["lesson_number"] == 2
 
 
 class TestVectorStoreConfiguration:
     """Test VectorStore configuration validation"""
 
-    def test_production_config_max_results_check(self):
+    @pytest.mark.parametrize(
+        "predicate,msg",
+        [
+            pytest.param(
+                lambda c: c.MAX_RESULTS != 0, ZERO_MAX_RESULTS_MSG, id="nonzero"
+            ),
+            pytest.param(
+                lambda c: c.MAX_RESULTS > 0,
+                "MAX_RESULTS should be positive, got {}",
+                id="positive",
+            ),
+        ],
+    )
+    def test_max_results_sanity(self, prod_config, predicate, msg):
         """
         CRITICAL TEST: Detects if production config has MAX_RESULTS=0
 
         This test will FAIL if the bug exists, clearly identifying the issue.
         """
-        from config import config
-
-        assert config.MAX_RESULTS != 0, (
-            "\n\n"
-            "============================================================\n"
-            "BUG DETECTED: config.MAX_RESULTS is 0!\n"
-            "============================================================\n"
-            "\n"
-            "This causes VectorStore.search() to return no results because:\n"
-            "  - VectorStore passes n_results=0 to ChromaDB\n"
-            "  - ChromaDB returns empty results\n"
-            "  - CourseSearchTool returns 'No relevant content found'\n"
-            "  - The chatbot appears to be 'failing'\n"
-            "\n"
-            "FIX: Change line 21 in backend/config.py from:\n"
-            "    MAX_RESULTS: int = 0\n"
-            "to:\n"
-            "    MAX_RESULTS: int = 5\n"
-            "============================================================\n"
-        )
+        assert predicate(prod_config), msg.format(prod_config.MAX_RESULTS)
 
-    def test_max_results_should_be_positive(self):
-        """Test that MAX_RESULTS should be a positive integer"""
-        from config import config
 
-        assert (
-            config.MAX_RESULTS > 0
-        ), f"MAX_RESULTS should be positive, got {config.MAX_RESULTS}"
+class TestVectorStoreAddContent:
+    """Test VectorStore content addition methods against a fake Chroma client"""
 
+    def test_add_course_metadata(self, fake_vs, course_with_lesson):
+        """Test adding course metadata"""
+        fake_vs.add_course_metadata(course_with_lesson)
+
+        # Verify the catalog entry written, then that it is counted
+        document, metadata = fake_vs.course_catalog.records["Test Course"]
+        assert document == "Test Course"
+        assert metadata["instructor"] == "Test Instructor"
+        assert metadata["lesson_count"] == 1
+        assert json.loads(metadata["lessons_json"]) == [
+            {
+                "lesson_number": 1,
+                "lesson_title": "Lesson 1",
+                "lesson_link": "https://example.com/lesson1",
+            }
+        ]
+        assert fake_vs.get_course_count() == 1
 
-class TestVectorStoreAddContent:
-    """Test VectorStore content addition methods"""
+    def test_get_course_count_uses_collection_count(self, fake_vs):
+        """Test that counting courses doesn't fetch the catalog records"""
+        with (
+            patch.object(fake_vs.course_catalog, "count", return_value=3) as count,
+            patch.object(fake_vs.course_catalog, "get") as get,
+        ):
+            assert fake_vs.get_course_count() == 3
 
-    @pytest.fixture
-    def temp_chroma_path(self):
-        """Create temporary directory for ChromaDB"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            yield tmpdir
+        count.assert_called_once_with()
+        get.assert_not_called()
 
-    def test_add_course_metadata(self, temp_chroma_path):
-        """Test adding course metadata"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
+    def test_add_course_content_chunks(self, fake_vs, python101_chunk, js101_chunk):
+        """Test adding course content chunks"""
+        fake_vs.add_course_content([python101_chunk, js101_chunk])
 
-        course = Course(
-            title="Test Course",
-            course_link="https://example.com",
-            instructor="Test Instructor",
-            lessons=[
-                Lesson(
-                    lesson_number=1,
-                    title="Lesson 1",
-                    lesson_link="https://example.com/1",
-                )
-            ],
-        )
+        # Verify content was added by searching
+        results = fake_vs.search(query="basics")
+        assert len(results.documents) == 2
 
-        vs.add_course_metadata(course)
+    def test_get_lesson_link(self, fake_vs, course_with_lesson):
+        """Test retrieving lesson link"""
+        fake_vs.add_course_metadata(course_with_lesson)
 
-        # Verify course was added
-        count = vs.get_course_count()
-        assert count == 1
+        link = fake_vs.get_lesson_link("Test Course", 1)
+        assert link == "https://example.com/lesson1"
 
-    def test_add_course_content_chunks(self, temp_chroma_path):
-        """Test adding course content chunks"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
 
+class TestVectorStoreBulkAdd:
+    """Test VectorStore bulk add batching"""
+
+    def test_bulk_add_embeds_once_and_respects_max_batch(self, mock_chroma_vs):
+        """Test that chunks are embedded in one call and added in capped batches"""
+        mock_chroma_vs.client.get_max_batch_size.return_value = 2
         chunks = [
             CourseChunk(
-                content="Test content 1",
-                course_title="Test Course",
+                content=f"Content {i}",
+                course_title="Course A" if i < 3 else "Course B",
                 lesson_number=1,
-                chunk_index=0,
-            ),
+                chunk_index=i,
+            )
+            for i in range(5)
+        ]
+
+        mock_chroma_vs.vs.add_course_content(chunks)
+
+        mock_chroma_vs.embed.assert_called_once()
+        add_calls = mock_chroma_vs.content.add.call_args_list
+        assert [len(c.kwargs["ids"]) for c in add_calls] == [2, 2, 1]
+        assert add_calls[2].kwargs["ids"] == ["Course_B_4"]
+
+    @pytest.mark.parametrize("n_chunks", [1, 10, 100])
+    def test_add_course_content_uses_one_call(self, mock_chroma_vs, n_chunks):
+        """Test that a course's chunks are embedded and added in a single call each"""
+        chunks = [
             CourseChunk(
-                content="Test content 2",
-                course_title="Test Course",
+                content=f"Content {i}",
+                course_title="Course A",
                 lesson_number=1,
-                chunk_index=1,
-            ),
+                chunk_index=i,
+            )
+            for i in range(n_chunks)
         ]
 
-        vs.add_course_content(chunks)
-
-        # Verify content was added by searching
-        results = vs.search(query="Test content")
-        assert not results.is_empty()
+        mock_chroma_vs.vs.add_course_content(chunks)
+
+        mock_chroma_vs.embed.assert_called_once()
+        mock_chroma_vs.content.add.assert_called_once()
+        kwargs = mock_chroma_vs.content.add.call_args.kwargs
+        assert kwargs["ids"] == [f"Course_A_{i}" for i in range(n_chunks)]
+        assert len(kwargs["embeddings"]) == n_chunks
+
+    def test_bulk_metadata_add_uses_one_call(self, mock_chroma_vs):
+        """Test that catalog entries for several courses go in one add"""
+        courses = [
+            Course(title="Course A", instructor="Test"),
+            Course(
+                title="Course B",
+                lessons=[Lesson(lesson_number=1, title="Intro")],
+            ),
+        ]
 
-    def test_get_lesson_link(self, temp_chroma_path):
-        """Test retrieving lesson link"""
-        vs = VectorStore(
-            chroma_path=temp_chroma_path,
-            embedding_model="all-MiniLM-L6-v2",
-            max_results=5,
-        )
+        mock_chroma_vs.vs.add_course_metadata_bulk(courses)
+
+        mock_chroma_vs.embed.assert_called_once_with(["Course A", "Course B"])
+        mock_chroma_vs.catalog.add.assert_called_once()
+        kwargs = mock_chroma_vs.catalog.add.call_args.kwargs
+        assert kwargs["ids"] == ["Course A", "Course B"]
+        assert [m["lesson_count"] for m in kwargs["metadatas"]] == [0, 1]
+
+
+class TestVectorStoreCatalogCache:
+    """Test caching of catalog reads between writes"""
+
+    def test_lesson_links_cached_until_write(self, mock_chroma_vs):
+        """Test that lesson links for a course are fetched once per catalog version"""
+        vs, catalog = mock_chroma_vs.vs, mock_chroma_vs.catalog
+        catalog.get.return_value = {
+            "ids": ["Test Course"],
+            "metadatas": [
+                {
+                    "lessons_json": json.dumps(
+                        [
+                            {
+                                "lesson_number": 1,
+                                "lesson_link": "https://example.com/1",
+                            },
+                            {
+                                "lesson_number": 2,
+                                "lesson_link": "https://example.com/2",
+                            },
+                        ]
+                    )
+                }
+            ],
+        }
 
-        course = Course(
-            title="Test Course",
-            course_link="https://example.com",
-            instructor="Test Instructor",  # ChromaDB requires non-None metadata values
-            lessons=[
-                Lesson(
-                    lesson_number=1,
-                    title="Lesson 1",
-                    lesson_link="https://example.com/lesson1",
-                )
+        assert vs.get_lesson_link("Test Course", 1) == "https://example.com/1"
+        assert vs.get_lesson_link("Test Course", 2) == "https://example.com/2"
+        assert vs.get_lesson_link("Test Course", 3) is None
+        assert catalog.get.call_count == 1
+
+        vs.add_course_metadata(Course(title="Other Course", instructor="Test"))
+        vs.get_lesson_link("Test Course", 1)
+        assert catalog.get.call_count == 2
+
+    def test_lesson_links_bulk_returns_known_lessons(self, mock_chroma_vs):
+        """Test that a bulk lookup resolves several lessons with one catalog get"""
+        catalog = mock_chroma_vs.catalog
+        catalog.get.return_value = {
+            "ids": ["Test Course"],
+            "metadatas": [
+                {
+                    "lessons_json": json.dumps(
+                        [
+                            {"lesson_number": 1, "lesson_link": "https://x.com/1"},
+                            {"lesson_number": 2, "lesson_link": "https://x.com/2"},
+                        ]
+                    )
+                }
             ],
-        )
-        vs.add_course_metadata(course)
+        }
 
-        link = vs.get_lesson_link("Test Course", 1)
-        assert link == "https://example.com/lesson1"
+        links = mock_chroma_vs.vs.get_lesson_links_bulk("Test Course", {1, 2, 3})
+
+        assert links == {1: "https://x.com/1", 2: "https://x.com/2"}
+        catalog.get.assert_called_once_with(ids=["Test Course"])
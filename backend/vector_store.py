@@ -1,49 +1,23 @@
+import threading
 import chromadb
 from chromadb.config import Settings
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Set
 from models import Course, CourseChunk
-from sentence_transformers import SentenceTransformer
-
-
-@dataclass
-class SearchResults:
-    """Container for search results with metadata"""
-
-    documents: List[str]
-    metadata: List[Dict[str, Any]]
-    distances: List[float]
-    error: Optional[str] = None
-
-    @classmethod
-    def from_chroma(cls, chroma_results: Dict) -> "SearchResults":
-        """Create SearchResults from ChromaDB query results"""
-        return cls(
-            documents=(
-                chroma_results["documents"][0] if chroma_results["documents"] else []
-            ),
-            metadata=(
-                chroma_results["metadatas"][0] if chroma_results["metadatas"] else []
-            ),
-            distances=(
-                chroma_results["distances"][0] if chroma_results["distances"] else []
-            ),
-        )
-
-    @classmethod
-    def empty(cls, error_msg: str) -> "SearchResults":
-        """Create empty results with error message"""
-        return cls(documents=[], metadata=[], distances=[], error=error_msg)
-
-    def is_empty(self) -> bool:
-        """Check if results are empty"""
-        return len(self.documents) == 0
+from cachetools import TTLCache
+from embedding_cache import EmbeddingCache
+from search_results import SearchResults  # Re-exported for existing imports
 
 
 class VectorStore:
     """Vector storage using ChromaDB for course content and metadata"""
 
-    def __init__(self, chroma_path: str, embedding_model: str, max_results: int = 5):
+    def __init__(
+        self,
+        chroma_path: str,
+        embedding_model: str,
+        max_results: int = 5,
+        embedding_cache_path: Optional[str] = None,
+    ):
         self.max_results = max_results
         # Initialize ChromaDB client
         self.client = chromadb.PersistentClient(
@@ -57,6 +31,11 @@ class VectorStore:
             )
         )
 
+        # Optional persistent cache so identical texts are only embedded once
+        self.embedding_cache = None
+        if embedding_cache_path:
+            self.embedding_cache = EmbeddingCache(embedding_cache_path, embedding_model)
+
         # Create collections for different types of data
         self.course_catalog = self._create_collection(
             "course_catalog"
@@ -65,12 +44,25 @@ class VectorStore:
             "course_content"
         )  # Actual course material
 
+        # Catalog reads are cached per catalog version, which every write bumps;
+        # entries for old versions are never read again and age out. cachetools
+        # caches aren't thread-safe, and link prefetch reads from another thread
+        self.catalog_version = 0
+        self._catalog_cache = TTLCache(maxsize=4096, ttl=300)
+        self._catalog_lock = threading.Lock()
+
     def _create_collection(self, name: str):
         """Create or get a ChromaDB collection"""
         return self.client.get_or_create_collection(
             name=name, embedding_function=self.embedding_function
         )
 
+    def embed(self, texts: List[str]) -> List:
+        """Embed texts, reusing persisted embeddings when a cache is configured"""
+        if self.embedding_cache is None:
+            return self.embedding_function(texts)
+        return self.embedding_cache.embed(texts, self.embedding_function)
+
     def search(
         self,
         query: str,
@@ -106,7 +98,9 @@ class VectorStore:
 
         try:
             results = self.course_content.query(
-                query_texts=[query], n_results=search_limit, where=filter_dict
+                query_embeddings=self.embed([query]),
+                n_results=search_limit,
+                where=filter_dict,
             )
             return SearchResults.from_chroma(results)
         except Exception as e:
@@ -115,7 +109,9 @@ class VectorStore:
     def _resolve_course_name(self, course_name: str) -> Optional[str]:
         """Use vector search to find best matching course by name"""
         try:
-            results = self.course_catalog.query(query_texts=[course_name], n_results=1)
+            results = self.course_catalog.query(
+                query_embeddings=self.embed([course_name]), n_results=1
+            )
 
             if results["documents"][0] and results["metadatas"][0]:
                 # Return the title (which is now the ID)
@@ -148,24 +144,29 @@ class VectorStore:
 
     def add_course_metadata(self, course: Course):
         """Add course information to the catalog for semantic search"""
-        import json
+        self.add_course_metadata_bulk([course])
 
-        course_text = course.title
+    def add_course_metadata_bulk(self, courses: List[Course]):
+        """Add catalog entries for any number of courses in one pass"""
+        if not courses:
+            return
 
-        # Build lessons metadata and serialize as JSON string
-        lessons_metadata = []
-        for lesson in course.lessons:
-            lessons_metadata.append(
-                {
-                    "lesson_number": lesson.lesson_number,
-                    "lesson_title": lesson.title,
-                    "lesson_link": lesson.lesson_link,
-                }
-            )
+        import json
 
-        self.course_catalog.add(
-            documents=[course_text],
-            metadatas=[
+        documents = [course.title for course in courses]
+        metadatas = []
+        for course in courses:
+            # Build lessons metadata and serialize as JSON string
+            lessons_metadata = []
+            for lesson in course.lessons:
+                lessons_metadata.append(
+                    {
+                        "lesson_number": lesson.lesson_number,
+                        "lesson_title": lesson.title,
+                        "lesson_link": lesson.lesson_link,
+                    }
+                )
+            metadatas.append(
                 {
                     "title": course.title,
                     "instructor": course.instructor,
@@ -175,15 +176,39 @@ class VectorStore:
                     ),  # Serialize as JSON string
                     "lesson_count": len(course.lessons),
                 }
-            ],
-            ids=[course.title],
-        )
+            )
+        ids = [course.title for course in courses]
+
+        self._add_batched(self.course_catalog, documents, metadatas, ids)
+        self._bump_catalog_version()
 
     def add_course_content(self, chunks: List[CourseChunk]):
-        """Add course content chunks to the vector store"""
+        """Embed chunks from any number of courses in one pass and store them"""
         if not chunks:
             return
 
+        documents, metadatas, ids = self._chunk_records(chunks)
+        self._add_batched(self.course_content, documents, metadatas, ids)
+        self._bump_catalog_version()
+
+    def _add_batched(self, collection, documents, metadatas, ids):
+        """Embed records in one pass and add them in as few Chroma calls as allowed"""
+        # One encoder call for everything; the model batches internally
+        embeddings = self.embed(documents)
+
+        # Chroma caps the number of records per add
+        batch_size = self.client.get_max_batch_size()
+        for start in range(0, len(documents), batch_size):
+            end = start + batch_size
+            collection.add(
+                documents=documents[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+            )
+
+    def _chunk_records(self, chunks: List[CourseChunk]):
+        """Build parallel documents/metadatas/ids lists for chunks"""
         documents = [chunk.content for chunk in chunks]
         metadatas = [
             {
@@ -198,8 +223,7 @@ class VectorStore:
             f"{chunk.course_title.replace(' ', '_')}_{chunk.chunk_index}"
             for chunk in chunks
         ]
-
-        self.course_content.add(documents=documents, metadatas=metadatas, ids=ids)
+        return documents, metadatas, ids
 
     def clear_all_data(self):
         """Clear all data from both collections"""
@@ -211,6 +235,11 @@ class VectorStore:
             self.course_content = self._create_collection("course_content")
         except Exception as e:
             print(f"Error clearing data: {e}")
+        self._bump_catalog_version()
+
+    def _bump_catalog_version(self):
+        """Invalidate cached catalog reads after a write"""
+        self.catalog_version += 1
 
     def get_existing_course_titles(self) -> List[str]:
         """Get all existing course titles from the vector store"""
@@ -227,10 +256,8 @@ class VectorStore:
     def get_course_count(self) -> int:
         """Get the total number of courses in the vector store"""
         try:
-            results = self.course_catalog.get()
-            if results and "ids" in results:
-                return len(results["ids"])
-            return 0
+            # count() is answered by Chroma without fetching any records
+            return self.course_catalog.count()
         except Exception as e:
             print(f"Error getting course count: {e}")
             return 0
@@ -239,6 +266,12 @@ class VectorStore:
         """Get metadata for all courses in the vector store"""
         import json
 
+        key = ("all_meta", self.catalog_version)
+        with self._catalog_lock:
+            cached = self._catalog_cache.get(key)
+        if cached is not None:
+            return list(cached)
+
         try:
             results = self.course_catalog.get()
             if results and "metadatas" in results:
@@ -252,7 +285,9 @@ class VectorStore:
                             "lessons_json"
                         ]  # Remove the JSON string version
                     parsed_metadata.append(course_meta)
-                return parsed_metadata
+                with self._catalog_lock:
+                    self._catalog_cache[key] = parsed_metadata
+                return list(parsed_metadata)
             return []
         except Exception as e:
             print(f"Error getting courses metadata: {e}")
@@ -273,20 +308,44 @@ class VectorStore:
 
     def get_lesson_link(self, course_title: str, lesson_number: int) -> Optional[str]:
         """Get lesson link for a given course title and lesson number"""
+        lesson_links = self._get_lesson_links(course_title)
+        if lesson_links is None:
+            return None
+        return lesson_links.get(lesson_number)
+
+    def get_lesson_links_bulk(
+        self, course_title: str, lesson_numbers: Set[int]
+    ) -> Dict[int, str]:
+        """Get links for several lessons of a course with one catalog lookup"""
+        lesson_links = self._get_lesson_links(course_title) or {}
+        return {n: lesson_links[n] for n in lesson_numbers if n in lesson_links}
+
+    def _get_lesson_links(self, course_title: str) -> Optional[Dict[int, str]]:
+        """Get all lesson links for a course with one catalog lookup (cached)"""
         import json
 
+        key = ("lesson_links", course_title, self.catalog_version)
+        with self._catalog_lock:
+            cached = self._catalog_cache.get(key)
+        if cached is not None:
+            return cached
+
         try:
             # Get course by ID (title is the ID)
+            lesson_links = {}
             results = self.course_catalog.get(ids=[course_title])
             if results and "metadatas" in results and results["metadatas"]:
                 metadata = results["metadatas"][0]
                 lessons_json = metadata.get("lessons_json")
                 if lessons_json:
-                    lessons = json.loads(lessons_json)
-                    # Find the lesson with matching number
-                    for lesson in lessons:
-                        if lesson.get("lesson_number") == lesson_number:
-                            return lesson.get("lesson_link")
-            return None
+                    for lesson in json.loads(lessons_json):
+                        if lesson.get("lesson_link"):
+                            lesson_links[lesson.get("lesson_number")] = lesson[
+                                "lesson_link"
+                            ]
+            with self._catalog_lock:
+                self._catalog_cache[key] = lesson_links
+            return lesson_links
         except Exception as e:
             print(f"Error getting lesson link: {e}")
+            return None
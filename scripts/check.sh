@@ -12,7 +12,7 @@ echo "Formatting: OK"
 echo ""
 
 echo "=== Running Tests ==="
-uv run pytest backend/tests/ -v
+uv run pytest backend/tests/ -v --runslow
 echo ""
 
 echo "All checks passed!"